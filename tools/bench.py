@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# ------------------------------------------------------------
+#  Headless benchmark for the display's layout and drawing
+#  • Runs wrap_text, draw_list_view and draw_enhanced_undo_modal
+#    under SDL's dummy video driver, so no screen is needed.
+#  • Synthetic lists of 10–1000 cards with short, long and
+#    unicode-heavy text, in landscape and portrait.
+#  • Reports time per frame (mean / p95), frames per second and
+#    Python allocations per frame (tracemalloc; pixel buffers
+#    allocated inside SDL are not counted).
+#
+#  python tools/bench.py
+#  python tools/bench.py --counts 1000 --sizes 480x320 --json > after.json
+# ------------------------------------------------------------
+import argparse, json, math, os, random, statistics, sys, tempfile, time, tracemalloc
+from pathlib import Path
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # Keep --json output clean
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import trello_display as td  # noqa: E402  (needs the path and driver set up first)
+
+WORDS = {
+    "short":   ["Buy", "milk", "Call", "mum", "Fix", "bike", "Pay", "rent", "Email", "Sam"],
+    "long":    ["Remember", "to", "renew", "the", "car", "insurance", "before", "the", "end",
+                "of", "the", "month", "and", "compare", "quotes", "from", "at", "least",
+                "three", "providers", "including", "the", "current", "one"],
+    "unicode": ["Crème", "brûlée", "für", "Jürgen", "Ελληνικά", "кириллица", "日本語の",
+                "テキスト", "中文字符", "naïve", "café", "Ångström", "ŽŠČ", "ﬁnish"],
+}
+WORDS_PER_CARD = {"short": (2, 4), "long": (20, 40), "unicode": (4, 12)}
+
+
+def make_cards(n, kind, seed=1):
+    rng = random.Random(seed)
+    lo, hi = WORDS_PER_CARD[kind]
+    return [td.Card(f"card{i}", " ".join(rng.choice(WORDS[kind]) for _ in range(rng.randint(lo, hi))))
+            for i in range(n)]
+
+
+def reset_caches():
+    """Forget everything the display caches, so each case starts cold."""
+    td.card_atlas.clear()
+    td.layout_cache.clear()
+    td.modal_cache.clear()
+    td.list_index = None
+    td.list_index_stale_from = None
+    td.scroll_y = 0.0
+
+
+def measure(frame, frames):
+    """Time frame(k) for k in range(frames), then run it again under tracemalloc.
+    Return a dict of timing and allocation figures."""
+    times = []
+    for k in range(frames):
+        t0 = time.perf_counter()
+        frame(k)
+        times.append(time.perf_counter() - t0)
+    # Allocations are measured in a separate pass; tracing slows every call down
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for k in range(frames):
+        frame(k)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    mean = statistics.fmean(times)
+    return {
+        "mean_ms": mean * 1000,
+        "p95_ms": sorted(times)[math.ceil(len(times) * 0.95) - 1] * 1000,
+        "fps": 1 / mean if mean else float("inf"),
+        "alloc_blocks_per_frame": sum(max(s.count_diff, 0) for s in stats) / frames,
+        "alloc_peak_kib": peak / 1024,
+    }
+
+
+def bench_wrap(cards, frames):
+    inner_w = td.card_container_width() - 40
+    font = td.fonts['default']
+    return measure(lambda k: [td.wrap_text(card.name, font, inner_w) for card in cards], frames)
+
+
+def bench_list_first_frame(cards, frames):
+    """First frame after a snapshot lands: wrap, index and render what is visible."""
+    def frame(k):
+        reset_caches()
+        td.begin_frame([], full=True)
+        td.draw_list_view(cards)
+        td.end_frame()
+    return measure(frame, frames)
+
+
+def bench_list_scroll(cards, frames):
+    """Steady-state frames while the list is dragged through its whole length."""
+    reset_caches()
+    index = td.get_list_index(cards)
+    span = td.max_scroll(index)
+
+    def frame(k):
+        td.scroll_y = float((k * 37) % (span + 1)) if span else 0.0
+        td.begin_frame([], full=True)
+        td.draw_list_view(cards)
+        td.end_frame()
+    return measure(frame, frames)
+
+
+def bench_modal(cards, frames):
+    """Full-screen modal frames over the cached list background, with the dismiss timer running."""
+    reset_caches()
+    layout = td.layout_card(cards[0], td.card_container_width())
+    surface = td.card_surface(layout)
+    background = td.build_modal_background(cards[1:])
+    modal_y = td.HEIGHT - max(int(td.HEIGHT * 0.40), 280) - 20
+    card_pos = ((td.WIDTH - surface.get_width()) // 2, modal_y + 60)
+
+    def frame(k):
+        td.begin_frame([], full=True)
+        td.screen.blit(background, (0, 0))
+        td.draw_enhanced_undo_modal(td.screen, td.fonts, modal_y, surface, card_pos,
+                                    (k % frames) / frames, draw_skrim=False)
+        td.end_frame()
+    return measure(frame, frames)
+
+
+BENCHES = {
+    "wrap_text": bench_wrap,
+    "list_first_frame": bench_list_first_frame,
+    "list_scroll": bench_list_scroll,
+    "modal": bench_modal,
+}
+
+
+def parse_size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmark of the display's hot paths")
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=[(480, 320), (320, 480)],
+                        help="screen sizes as WIDTHxHEIGHT")
+    parser.add_argument("--counts", nargs="+", type=int, default=[10, 100, 1000], help="cards per list")
+    parser.add_argument("--texts", nargs="+", choices=sorted(WORDS), default=["short", "long", "unicode"])
+    parser.add_argument("--benches", nargs="+", choices=list(BENCHES), default=list(BENCHES))
+    parser.add_argument("--frames", type=int, default=60, help="frames measured per case")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per case")
+    args = parser.parse_args()
+    # Keep the real display's font cache out of it
+    td.FONT_CACHE_PATH = Path(tempfile.mkdtemp(prefix="trello-bench-")) / "font_cache.json"
+
+    if not args.json:
+        print(f"{'bench':<17} {'size':>8} {'text':>8} {'cards':>6} {'mean ms':>8} {'p95 ms':>8}"
+              f" {'fps':>8} {'blocks/f':>9} {'peak KiB':>9}")
+    for size in args.sizes:
+        td.init_display(size)
+        for kind in args.texts:
+            for n in args.counts:
+                cards = make_cards(n, kind)
+                for name in args.benches:
+                    result = BENCHES[name](cards, args.frames)
+                    case = {"bench": name, "size": f"{size[0]}x{size[1]}", "text": kind, "cards": n}
+                    if args.json:
+                        print(json.dumps({**case, **{k: round(v, 4) for k, v in result.items()}}))
+                    else:
+                        print(f"{name:<17} {case['size']:>8} {kind:>8} {n:>6} {result['mean_ms']:>8.3f}"
+                              f" {result['p95_ms']:>8.3f} {result['fps']:>8.0f}"
+                              f" {result['alloc_blocks_per_frame']:>9.1f} {result['alloc_peak_kib']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
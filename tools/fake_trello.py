@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# ------------------------------------------------------------
+#  Local stand-in for the parts of the Trello API the display uses
+#  • Lists and their cards, ETags / 304s, the board activity
+#    probe, /1/batch, archive/unarchive PUTs and webhook
+#    registration.
+#  • Fault injection: latency, 5xx errors, dropped connections,
+#    429s beyond a request budget (announced in Trello's
+#    x-rate-limit-* headers), and lists that churn (cards
+#    added, archived, renamed and reordered elsewhere).
+#  • --replay serves the card lists captured by a display run
+#    with TRELLO_RECORD set, at their recorded pace.
+#
+#  python tools/fake_trello.py --lists L1,L2 --latency 0.3 --churn 2
+#  TRELLO_API=http://127.0.0.1:8700/1 LIST_IDS=L1,L2 python trello_display.py
+#  python tools/fake_trello.py --replay trello_traffic.jsonl --speed 10
+# ------------------------------------------------------------
+import argparse, collections, http.server, json, random, re, threading, time, urllib.parse
+
+LABEL_COLORS = ["green", "yellow", "orange", "red", "purple", "blue", "sky", "lime", "pink", "black"]
+WORDS = ["Buy", "milk", "Call", "the", "plumber", "Renew", "insurance", "Book", "dentist",
+         "Fix", "bike", "Email", "Sam", "about", "Friday", "Pay", "rent", "Water", "plants"]
+RATE_WINDOW = 10.0  # Seconds; Trello allows 100 requests per 10 s per token
+
+ROUTES = [  # (method, path pattern, handler name)
+    ("GET",  re.compile(r"/1/lists/([^/]+)/cards$"), "get_cards"),
+    ("GET",  re.compile(r"/1/lists/([^/]+)$"),       "get_list"),
+    ("GET",  re.compile(r"/1/boards/([^/]+)$"),      "get_board"),
+    ("GET",  re.compile(r"/1/batch$"),               "get_batch"),
+    ("PUT",  re.compile(r"/1/cards/([^/]+)$"),       "put_card"),
+    ("POST", re.compile(r"/1/webhooks/?$"),          "post_webhook"),
+]
+
+
+class FakeTrello:
+    """In-memory lists of cards served over HTTP, with injectable faults.
+    Start it with start(); tools/soak.py also reads its state directly."""
+
+    def __init__(self, list_ids, cards_per_list=20, latency=0.0, error_rate=0.0, drop_rate=0.0,
+                 rate_limit=0, churn=0.0, seed=None):
+        self.rng = random.Random(seed)
+        self.latency, self.error_rate, self.drop_rate = latency, error_rate, drop_rate
+        self.rate_limit, self.churn = rate_limit, churn
+        self.lock = threading.Lock()
+        self.cards = {}                      # card id -> Trello-shaped card dict (open and archived)
+        self.order = {}                      # list id -> card ids in list order
+        self.versions = collections.Counter()  # list id -> bumped on every change, for ETags
+        self.activity = 0                    # Bumped on every change, for the board probe
+        self.recent = collections.deque()    # Request times inside the rate-limit window
+        self.stats = collections.Counter()   # "METHOD route status" -> count
+        self.churn_paused = threading.Event()
+        self.archived_elsewhere = set()      # Card ids archived by churn or replay, not by a client
+        self.next_id = 0
+        for list_id in list_ids:
+            self.order[list_id] = []
+            for _ in range(cards_per_list):
+                self.add_card(list_id)
+
+    # ---------- state -------------------------------------------------
+    def new_id(self):
+        self.next_id += 1
+        return f"{self.next_id:024x}" # Trello ids are 24 hex digits
+
+    def random_name(self):
+        return " ".join(self.rng.choice(WORDS) for _ in range(self.rng.randint(2, 9)))
+
+    def add_card(self, list_id, position=None, card=None):
+        # Caller holds self.lock (or is still in __init__)
+        card = card or {"id": self.new_id(), "name": self.random_name(),
+                        "labels": [{"color": c} for c in self.rng.sample(LABEL_COLORS, self.rng.choice([0, 0, 1, 2]))],
+                        "due": None, "dueComplete": False}
+        card.update(closed=False, idList=list_id)
+        card.setdefault("idAttachmentCover", None) # Replayed cards keep their covers
+        card.setdefault("attachments", [])
+        self.cards[card["id"]] = card
+        order = self.order[list_id]
+        if card["id"] in order:
+            order.remove(card["id"])
+        order.insert(len(order) if position is None else position, card["id"])
+        self.touch(list_id)
+        return card
+
+    def touch(self, list_id):
+        self.versions[list_id] += 1
+        self.activity += 1
+
+    def open_cards(self, list_id):
+        """Ids of a list's open cards, in order."""
+        with self.lock:
+            return [i for i in self.order[list_id] if not self.cards[i]["closed"]]
+
+    def is_closed(self, card_id):
+        with self.lock:
+            return self.cards[card_id]["closed"] if card_id in self.cards else None
+
+    def churn_once(self):
+        """Change one list the way someone else editing the board would."""
+        with self.lock:
+            list_id = self.rng.choice(list(self.order))
+            open_ids = [i for i in self.order[list_id] if not self.cards[i]["closed"]]
+            kind = self.rng.choice(["add", "archive", "rename", "move"] if open_ids else ["add"])
+            if kind == "add":
+                self.add_card(list_id, self.rng.randint(0, len(self.order[list_id])))
+            elif kind == "archive":
+                card_id = self.rng.choice(open_ids)
+                self.cards[card_id]["closed"] = True
+                self.archived_elsewhere.add(card_id)
+            elif kind == "rename":
+                self.cards[self.rng.choice(open_ids)]["name"] = self.random_name()
+            else:
+                order = self.order[list_id]
+                card_id = self.rng.choice(open_ids)
+                order.remove(card_id)
+                order.insert(self.rng.randint(0, len(order)), card_id)
+            self.touch(list_id)
+
+    def churn_worker(self):
+        while True:
+            time.sleep(self.churn * self.rng.uniform(0.5, 1.5))
+            if not self.churn_paused.is_set():
+                self.churn_once()
+
+    # ---------- replay ------------------------------------------------
+    def load_recording(self, path, speed=1.0):
+        """Serve the card lists a TRELLO_RECORD file captured: the first of each
+        list at once, the rest at their recorded pace (speed times faster)."""
+        with open(path) as f:
+            events = [e for e in map(json.loads, filter(str.strip, f))
+                      if e.get("op") == "fetch" and e.get("status") == 200]
+        if not events:
+            raise SystemExit(f"{path}: no recorded card fetches")
+        seen = set()
+        later = []
+        for event in events:
+            if event["list_id"] in seen:
+                later.append(event)
+            else:
+                seen.add(event["list_id"])
+                self.order.setdefault(event["list_id"], [])
+                self.set_list(event["list_id"], event["cards"])
+
+        def replay():
+            t0, start = time.time(), events[0]["at"]
+            for event in later:
+                time.sleep(max(0.0, (event["at"] - start) / speed - (time.time() - t0)))
+                self.set_list(event["list_id"], event["cards"])
+        threading.Thread(target=replay, name="fake-trello-replay", daemon=True).start()
+
+    def set_list(self, list_id, cards):
+        """Make a list hold exactly `cards` (Trello JSON), archiving the rest."""
+        with self.lock:
+            for card_id in self.order[list_id]:
+                self.cards[card_id]["closed"] = True
+                self.archived_elsewhere.add(card_id)
+            self.order[list_id] = []
+            for card in cards:
+                self.add_card(list_id, card=dict(card))
+            self.touch(list_id)
+
+    # ---------- HTTP --------------------------------------------------
+    def fault(self, cost=1):
+        """Return the status to fail this request with (0 = drop the
+        connection), or None to serve it, after the injected latency.
+        A batch costs one request per route, as on Trello."""
+        if self.latency:
+            time.sleep(self.latency * self.rng.uniform(0.5, 1.5))
+        with self.lock:
+            now = time.time()
+            self.recent.extend([now] * cost)
+            while self.recent and self.recent[0] < now - RATE_WINDOW:
+                self.recent.popleft()
+            if self.rate_limit and len(self.recent) > self.rate_limit:
+                return 429
+            if self.rng.random() < self.drop_rate:
+                return 0
+            if self.rng.random() < self.error_rate:
+                return self.rng.choice([500, 502, 503])
+        return None
+
+    def get_cards(self, list_id, query, headers):
+        with self.lock:
+            if list_id not in self.order:
+                return 404, None, {}
+            etag = f'"{list_id}-{self.versions[list_id]}"'
+            if headers.get("If-None-Match") == etag:
+                return 304, None, {"ETag": etag}
+            cards = [self.cards[i] for i in self.order[list_id] if not self.cards[i]["closed"]]
+            return 200, json.loads(json.dumps(cards)), {"ETag": etag}
+
+    def get_list(self, list_id, query, headers):
+        if list_id not in self.order:
+            return 404, None, {}
+        return 200, {"id": list_id, "idBoard": "fakeboard", "name": f"List {list_id}"}, {}
+
+    def get_board(self, board_id, query, headers):
+        with self.lock:
+            return 200, {"id": board_id, "dateLastActivity": f"activity-{self.activity}"}, {}
+
+    def get_batch(self, _, query, headers):
+        """Serve each GET route in urls=, comma-separated, like Trello: one
+        {"200": body} per route, or an error object with its statusCode."""
+        replies = []
+        for route in query.get("urls", "").split(","):
+            url = urllib.parse.urlsplit(route)
+            for route_method, pattern, name in ROUTES:
+                match = pattern.match("/1" + url.path)
+                if route_method == "GET" and match and name != "get_batch":
+                    break
+            else:
+                replies.append({"name": "NotFound", "message": "no such route", "statusCode": 404})
+                continue
+            status, body, _ = getattr(self, name)(match.group(1), dict(urllib.parse.parse_qsl(url.query)), {})
+            with self.lock:
+                self.stats[f"batched {name} {status}"] += 1
+            replies.append({str(status): body} if status == 200 else
+                           {"name": "Error", "message": f"HTTP {status}", "statusCode": status})
+        return 200, replies, {}
+
+    def rate_headers(self):
+        """Trello's rate-limit headers for the current window."""
+        if not self.rate_limit:
+            return {}
+        with self.lock:
+            remaining = max(0, self.rate_limit - len(self.recent))
+        return {"x-rate-limit-api-token-interval-ms": str(int(RATE_WINDOW * 1000)),
+                "x-rate-limit-api-token-max": str(self.rate_limit),
+                "x-rate-limit-api-token-remaining": str(remaining)}
+
+    def put_card(self, card_id, query, headers):
+        with self.lock:
+            card = self.cards.get(card_id)
+            if card is None:
+                return 404, None, {}
+            if "closed" in query:
+                card["closed"] = query["closed"] == "true"
+                self.touch(card["idList"])
+            return 200, dict(card), {}
+
+    def post_webhook(self, _, query, headers):
+        with self.lock:
+            return 200, {"id": self.new_id(), "idModel": query.get("idModel")}, {}
+
+    def handler(self):
+        fake = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # Keep-alive, like api.trello.com
+
+            def route(self, method):
+                url = urllib.parse.urlsplit(self.path)
+                query = dict(urllib.parse.parse_qsl(url.query))
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                for route_method, pattern, name in ROUTES:
+                    match = pattern.match(url.path)
+                    if route_method == method and match:
+                        break
+                else:
+                    return self.reply(f"{method} ?", 404, None, {})
+                cost = len(query.get("urls", "").split(",")) if name == "get_batch" else 1
+                status = fake.fault(cost)
+                if status == 0:
+                    with fake.lock:
+                        fake.stats[f"{method} {name} dropped"] += 1
+                    self.close_connection = True
+                    return
+                if status:
+                    return self.reply(f"{method} {name}", status, None, fake.rate_headers())
+                status, body, headers = getattr(fake, name)(match.group(1) if match.groups() else None,
+                                                            query, self.headers)
+                self.reply(f"{method} {name}", status, body, {**headers, **fake.rate_headers()})
+
+            def reply(self, key, status, body, headers):
+                with fake.lock:
+                    fake.stats[f"{key} {status}"] += 1
+                data = b"" if body is None else json.dumps(body).encode()
+                if status >= 400 and not data:
+                    data = b"API_TOKEN_LIMIT_EXCEEDED" if status == 429 else b"fake error"
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if status != 304:
+                    self.send_header("Content-Type", "application/json" if body is not None else "text/plain")
+                    self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                if status != 304:
+                    self.wfile.write(data)
+
+            def do_GET(self):
+                self.route("GET")
+
+            def do_PUT(self):
+                self.route("PUT")
+
+            def do_POST(self):
+                self.route("POST")
+
+            def log_message(self, format, *args):
+                pass
+        return Handler
+
+    def start(self, port=0, host="127.0.0.1"):
+        """Serve in background threads; return the base URL to use as TRELLO_API."""
+        server = http.server.ThreadingHTTPServer((host, port), self.handler())
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="fake-trello", daemon=True).start()
+        if self.churn:
+            threading.Thread(target=self.churn_worker, name="fake-trello-churn", daemon=True).start()
+        return f"http://{host}:{server.server_address[1]}/1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake of the Trello API for load and soak tests")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--host", default="127.0.0.1", help="0.0.0.0 to serve a display on another machine")
+    parser.add_argument("--lists", default="L1", help="comma-separated list ids to serve")
+    parser.add_argument("--cards", type=int, default=20, help="cards per list to start with")
+    parser.add_argument("--latency", type=float, default=0.0, help="mean seconds added to each request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 5xx")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="fraction of connections dropped unanswered")
+    parser.add_argument("--rate-limit", type=int, default=0,
+                        help=f"requests allowed per {RATE_WINDOW:g} s before 429s (0 = unlimited)")
+    parser.add_argument("--churn", type=float, default=0.0, help="mean seconds between outside edits (0 = none)")
+    parser.add_argument("--replay", help="TRELLO_RECORD file to serve instead of generated lists")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay this many times faster")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--report", type=float, default=60.0, help="seconds between request counts")
+    args = parser.parse_args()
+
+    fake = FakeTrello([] if args.replay else args.lists.split(","), args.cards, args.latency,
+                      args.error_rate, args.drop_rate, args.rate_limit, args.churn, args.seed)
+    if args.replay:
+        fake.load_recording(args.replay, args.speed)
+    print(f"Fake Trello serving lists {', '.join(fake.order)} at {fake.start(args.port, args.host)}")
+    while True:
+        time.sleep(args.report)
+        with fake.lock:
+            print(", ".join(f"{k}: {v}" for k, v in sorted(fake.stats.items())) or "no requests yet")
+
+
+if __name__ == "__main__":
+    main()
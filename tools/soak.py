@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# ------------------------------------------------------------
+#  Headless soak test of the display against tools/fake_trello.py
+#  • Runs the real main loop under SDL's dummy video driver and
+#    drives it with scripted taps: open a card and undo, dismiss
+#    or let the modal time out, tap during the animations, scroll.
+#  • After every step checks the undo state machine: a card lost
+#    or duplicated in `tasks`, an undone card back in the wrong
+#    place, an archived card still shown, modal state left over.
+#  • Every few steps pauses the churn, waits for the write queue
+#    to drain and checks the screen against the fake's lists.
+#  • Reports frame-time percentiles, memory growth and request
+#    counts every --report seconds; exits 1 if anything was wrong.
+#
+#  python tools/soak.py --duration 4h --latency 0.3 --error-rate 0.05 --churn 5
+#  python tools/soak.py --duration 10m --rate-limit 20 --json > soak.jsonl
+# ------------------------------------------------------------
+import argparse, collections, json, math, os, random, shutil, sys, tempfile, threading, time, traceback
+from pathlib import Path
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from fake_trello import FakeTrello  # noqa: E402  (tools/ is on the path as the script's directory)
+
+ACTIONS = {"undo": 4, "dismiss": 3, "timeout": 1, "tap_while_animating": 1, "scroll": 2}  # Weights
+
+
+def parse_duration(text):
+    units = {"s": 1, "m": 60, "h": 3600}
+    return float(text[:-1]) * units[text[-1]] if text[-1] in units else float(text)
+
+
+def parse_size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource # Peak rather than current size, where there is no /proc
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(sorted_values, q):
+    return sorted_values[max(0, math.ceil(len(sorted_values) * q) - 1)] if sorted_values else 0.0
+
+
+class Soak:
+    def __init__(self, td, fake, args):
+        self.td, self.fake, self.args = td, fake, args
+        self.rng = random.Random(args.seed)
+        self.started = time.time()
+        self.cycles = 0
+        self.actions = collections.Counter()
+        self.problems = []        # (seconds into the run, description)
+        self.frame_times = []     # Seconds per frame since the last report
+        self.baseline_rss = None  # Taken at the first report after --warmup
+        self.undone = set()       # Card ids whose unarchive must reach the fake
+        self.archived = set()     # ...and whose archive must
+
+    # ---------- driving the display -----------------------------------
+    def wait(self, condition, timeout):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if condition():
+                return True
+            time.sleep(0.02)
+        return condition()
+
+    def post(self, kind, **attrs):
+        self.td.pygame.event.post(self.td.pygame.event.Event(kind, **attrs))
+
+    def tap(self, pos):
+        self.post(self.td.pygame.MOUSEBUTTONDOWN, pos=pos, button=1)
+        self.post(self.td.pygame.MOUSEBUTTONUP, pos=pos, button=1)
+
+    def drag(self, x, y0, y1, steps=8, seconds=0.15):
+        self.post(self.td.pygame.MOUSEBUTTONDOWN, pos=(x, y0), button=1)
+        for k in range(1, steps + 1):
+            time.sleep(seconds / steps)
+            self.post(self.td.pygame.MOUSEMOTION, pos=(x, y0 + (y1 - y0) * k // steps), rel=(0, 0), buttons=(1, 0, 0))
+        self.post(self.td.pygame.MOUSEBUTTONUP, pos=(x, y1), button=1)
+
+    def in_list_view(self):
+        td = self.td
+        return td.app_state == td.APP_STATE_LIST_VIEW and td.touch is None and not td.fling_velocity
+
+    def pick_card(self):
+        """Return (card, task index, screen point) of a random real card on screen, or None."""
+        td = self.td
+        index = td.list_index
+        if index is None or td.list_index_stale_from is not None or index['key'][0] is not None:
+            return None
+        first, stop = td.visible_range(index)
+        candidates = []
+        for i in range(first, stop):
+            task_index, card, layout = index['items'][i]
+            top = td.item_screen_top(index, i)
+            y0, y1 = max(top, 0) + 2, min(top + layout['rect_h'], td.HEIGHT) - 2
+            if td.is_real_card(card.id) and y1 > y0:
+                candidates.append((card, task_index, (td.WIDTH // 2, (y0 + y1) // 2)))
+        return self.rng.choice(candidates) if candidates else None
+
+    # ---------- one step of the script --------------------------------
+    def step(self):
+        td = self.td
+        if not self.wait(self.in_list_view, 30):
+            return self.problem(f"display stuck in {td.app_state} for 30 s")
+        action = self.rng.choices(list(ACTIONS), weights=list(ACTIONS.values()))[0]
+        picked = None if action == "scroll" else self.pick_card()
+        if picked is None:
+            action = "scroll"
+        self.actions[action] += 1
+        if action == "scroll":
+            y0 = self.rng.randint(td.HEIGHT // 4, td.HEIGHT * 3 // 4)
+            self.drag(td.WIDTH // 2, y0, y0 + self.rng.choice([-1, 1]) * self.rng.randint(40, td.HEIGHT // 2))
+            self.wait(self.in_list_view, 10)
+            return
+
+        card, task_index, pos = picked
+        tasks_before = td.tasks
+        self.tap(pos)
+        if action == "tap_while_animating":
+            # Lands on the undo button's spot mid-animation: must be ignored
+            time.sleep(td.ANIMATION_DURATION / 3)
+            self.tap((td.WIDTH // 2, td.HEIGHT - 45))
+        if not self.wait(lambda: td.app_state == td.APP_STATE_MODAL_ACTIVE, 5):
+            if self.in_list_view() and td.tasks is not tasks_before:
+                self.actions["tap missed (list replaced)"] += 1
+                return
+            return self.problem(f"tap on card {card.id} did not open the modal (state {td.app_state})")
+        shown = td.animating_card_details['id']
+        if shown != card.id and td.tasks is tasks_before:
+            self.problem(f"tapped card {card.id} but the modal shows {shown}")
+        if shown in (c.id for c in td.tasks):
+            self.problem(f"card {shown} is in the modal and still in tasks")
+
+        undo = action in ("undo", "tap_while_animating")
+        if action == "timeout":
+            limit = td.UNDO_TIMEOUT + td.ANIMATION_DURATION + 5
+        else:
+            button = td.active_modal_buttons.get('undo_button' if undo else 'dismiss_button')
+            if button is None:
+                return self.problem("modal is active without its buttons")
+            self.tap(button.center)
+            limit = 5
+        if not self.wait(self.in_list_view, limit):
+            return self.problem(f"modal did not close after {action}")
+
+        ids = [c.id for c in td.tasks]
+        if undo:
+            self.undone.add(shown)
+            self.archived.discard(shown)
+            if ids.count(shown) != 1:
+                self.problem(f"card {shown} is in tasks {ids.count(shown)} times after undo")
+            elif td.tasks is tasks_before and ids.index(shown) != task_index:
+                self.problem(f"undo put card {shown} back at {ids.index(shown)}, it was at {task_index}")
+        else:
+            self.archived.add(shown)
+            self.undone.discard(shown)
+            if shown in ids:
+                self.problem(f"card {shown} is still in tasks after {action}")
+
+    def check_invariants(self):
+        td = self.td
+        if not self.in_list_view():
+            return
+        counts = collections.Counter(c.id for c in td.tasks)
+        for card_id, n in counts.items():
+            if n > 1:
+                self.problem(f"card {card_id} is in tasks {n} times")
+        if td.animating_card_details['id'] is not None or td.modal_background is not None:
+            self.problem("list view with modal state left over")
+        if td.card_atlas.pinned:
+            self.problem(f"{len(td.card_atlas.pinned)} card(s) still pinned in the atlas after the modal")
+        index = td.list_index
+        if index is not None and not 0 <= td.scroll_y <= td.max_scroll(index):
+            self.problem(f"scroll position {td.scroll_y} outside 0..{td.max_scroll(index)}")
+
+    def reconcile(self):
+        """With the churn paused and the writes sent, the screen must match the fake."""
+        td, fake = self.td, self.fake
+        fake.churn_paused.set()
+        try:
+            def drained():
+                with td.outbox_cond:
+                    return not td.outbox and td.outbox_in_flight is None
+            if not self.wait(drained, self.args.settle):
+                return self.problem(f"{len(td.outbox)} writes still queued after {self.args.settle:g} s")
+            for card_id in list(self.archived):
+                if fake.is_closed(card_id) is False:
+                    self.problem(f"archive of card {card_id} never reached Trello")
+            for card_id in list(self.undone):
+                if fake.is_closed(card_id) and card_id not in fake.archived_elsewhere:
+                    self.problem(f"undo of card {card_id} never reached Trello")
+            self.archived.clear()
+            self.undone.clear()
+
+            def server():
+                return [i for list_id in td.LIST_IDS for i in fake.open_cards(list_id)]
+            def screen():
+                return [c.id for c in td.tasks if td.is_real_card(c.id)]
+            deadline = time.time() + self.args.settle
+            while time.time() < deadline and screen() != server():
+                td.request_fetch(full=True)
+                self.wait(lambda: screen() == server(), 5)
+            if screen() != server():
+                lost = set(server()) - set(screen())
+                ghosts = set(screen()) - set(server())
+                self.problem(f"screen differs from Trello after {self.args.settle:g} s: "
+                             f"{len(lost)} cards missing, {len(ghosts)} extra"
+                             + ("" if lost or ghosts else ", same cards in a different order"))
+        finally:
+            fake.churn_paused.clear()
+
+    def refill(self):
+        """Add cards elsewhere when dismissals have emptied a list."""
+        for list_id in self.td.LIST_IDS:
+            missing = self.args.cards // 2 - len(self.fake.open_cards(list_id))
+            with self.fake.lock:
+                for _ in range(max(0, missing)):
+                    self.fake.add_card(list_id)
+
+    def problem(self, text):
+        elapsed = time.time() - self.started
+        self.problems.append((elapsed, text))
+        print(f"[{elapsed:9.1f}s] PROBLEM: {text}", file=sys.stderr, flush=True)
+
+    # ---------- reporting ---------------------------------------------
+    def report(self):
+        td = self.td
+        times, self.frame_times = sorted(self.frame_times), []
+        elapsed = time.time() - self.started
+        rss = rss_bytes()
+        if self.baseline_rss is None and elapsed >= self.args.warmup:
+            self.baseline_rss = rss
+        with self.fake.lock:
+            stats = dict(self.fake.stats)
+        requests = collections.Counter()
+        for key, n in stats.items():
+            status = key.rsplit(" ", 1)[1]
+            requests["total"] += n
+            if status in ("429", "dropped") or status.startswith("5"):
+                requests[status if status in ("429", "dropped") else "5xx"] += n
+        record = {
+            "elapsed_s": round(elapsed, 1), "steps": self.cycles, "actions": dict(self.actions),
+            "frames": len(times),
+            "frame_ms": {name: round(percentile(times, q) * 1000, 2)
+                         for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))},
+            "rss_mib": round(rss / 2**20, 1),
+            "rss_growth_mib": None if self.baseline_rss is None else round((rss - self.baseline_rss) / 2**20, 1),
+            "layout_cache": len(td.layout_cache), "tasks": len(td.tasks), "outbox": len(td.outbox),
+            "requests": dict(requests), "problems": len(self.problems),
+        }
+        if self.args.json:
+            print(json.dumps(record), flush=True)
+        else:
+            f = record["frame_ms"]
+            growth = "" if record["rss_growth_mib"] is None else f" ({record['rss_growth_mib']:+.1f})"
+            print(f"{elapsed / 60:7.1f} min  steps {self.cycles:6d}  frames {len(times):6d}"
+                  f"  frame ms p50 {f['p50']:.1f} p95 {f['p95']:.1f} p99 {f['p99']:.1f} max {f['max']:.1f}"
+                  f"  rss {record['rss_mib']:.1f} MiB{growth}  layouts {record['layout_cache']}"
+                  f"  requests {requests['total']} (429 {requests['429']}, 5xx {requests['5xx']},"
+                  f" dropped {requests['dropped']})  problems {len(self.problems)}", flush=True)
+
+    def record_frame(self, original):
+        def finish_frame():
+            original()
+            self.frame_times.append(self.td.frame_clock['phases']['total'])
+        return finish_frame
+
+    def run(self):
+        td = self.td
+        try:
+            if not self.wait(lambda: any(td.is_real_card(c.id) for c in td.tasks), 60):
+                self.problem("no cards loaded within 60 s")
+                return
+            end = self.started + self.args.duration
+            next_report = time.time() + self.args.report
+            while time.time() < end:
+                self.step()
+                self.check_invariants()
+                self.cycles += 1
+                if self.cycles % self.args.reconcile_every == 0:
+                    self.reconcile()
+                    self.refill()
+                if time.time() >= next_report:
+                    self.report()
+                    next_report += self.args.report
+                time.sleep(self.rng.uniform(0, self.args.pause))
+        except Exception:
+            self.problem("soak driver crashed:\n" + traceback.format_exc())
+        finally:
+            self.post(td.pygame.QUIT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless soak test of the display's undo flow")
+    parser.add_argument("--duration", type=parse_duration, default="10m", help="e.g. 90s, 30m, 4h")
+    parser.add_argument("--size", type=parse_size, default=(480, 320), help="screen size as WIDTHxHEIGHT")
+    parser.add_argument("--lists", type=int, default=2, help="lists shown")
+    parser.add_argument("--cards", type=int, default=30, help="cards per list to start with")
+    parser.add_argument("--latency", type=float, default=0.1, help="mean seconds added to each Trello request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 5xx")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="fraction of connections dropped")
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests per 10 s before 429s (0 = unlimited)")
+    parser.add_argument("--churn", type=float, default=5.0, help="mean seconds between outside edits (0 = none)")
+    parser.add_argument("--refresh", type=float, default=5.0, help="seconds between polls (REFRESH_SECS)")
+    parser.add_argument("--undo-timeout", type=float, default=1.5, help="seconds before the modal archives")
+    parser.add_argument("--pause", type=float, default=0.5, help="at most this many seconds between steps")
+    parser.add_argument("--reconcile-every", type=int, default=25, help="steps between checks against the fake")
+    parser.add_argument("--settle", type=float, default=120.0, help="seconds a check waits for writes and fetches")
+    parser.add_argument("--report", type=float, default=60.0, help="seconds between reports")
+    parser.add_argument("--warmup", type=float, default=60.0, help="seconds before the memory baseline is taken")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print one JSON object per report")
+    args = parser.parse_args()
+
+    list_ids = [f"soaklist{i}" for i in range(args.lists)]
+    fake = FakeTrello(list_ids, args.cards, args.latency, args.error_rate, args.drop_rate,
+                      args.rate_limit, args.churn, args.seed)
+    tmp = Path(tempfile.mkdtemp(prefix="trello-soak-"))
+    # Read when the display is imported; set here so trello_secrets.env cannot point it at real Trello
+    os.environ.update(TRELLO_API=fake.start(), API_KEY="soak", API_TOKEN="soak", LIST_ID=list_ids[0],
+                      LIST_IDS=",".join(list_ids), WEBHOOK_PORT="0", WEBHOOK_CALLBACK_URL="", METRICS_PATH="")
+    import trello_display as td
+
+    # Keep the real display's cache and journal files out of it
+    td.CARDS_CACHE_PATH = tmp / "cards_cache.json"
+    td.OUTBOX_PATH      = tmp / "pending_writes.json"
+    td.THUMB_CACHE_DIR  = tmp / "thumb_cache"
+    td.BOOT_TIMING_LOG  = tmp / "boot_timing.jsonl"
+    td.FONT_CACHE_PATH  = tmp / "font_cache.json"
+    td.REFRESH_SECS     = args.refresh
+    td.UNDO_TIMEOUT     = args.undo_timeout
+
+    soak = Soak(td, fake, args)
+    td.finish_frame = soak.record_frame(td.finish_frame)
+    threading.Thread(target=soak.run, name="soak-driver", daemon=True).start()
+    try:
+        td.main(args.size)
+    except SystemExit:
+        pass
+    if soak.frame_times: # Frames since the last report
+        soak.report()
+    shutil.rmtree(tmp, ignore_errors=True)
+    if soak.problems:
+        print(f"{len(soak.problems)} problems:", file=sys.stderr)
+        for elapsed, text in soak.problems:
+            print(f"  [{elapsed:9.1f}s] {text}", file=sys.stderr)
+        sys.exit(1)
+    print("No problems found")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# ------------------------------------------------------------
+#  Stand-in for Trello's webhook sender
+#  • Replays recorded webhook payloads (one JSON body per line,
+#    e.g. captured with WEBHOOK_RECORD) against a display
+#    running with WEBHOOK_PORT set, so the ingest path can be
+#    exercised offline.
+#  • "{LIST_ID}" in a payload is replaced with --list-id.
+#
+#  python tools/webhook_replay.py tools/webhook_samples.jsonl \
+#         --url http://localhost:8765/ --list-id <your list id>
+# ------------------------------------------------------------
+"""Replay recorded Trello webhook payloads against a display's webhook listener."""
+import argparse, base64, hashlib, hmac, time, urllib.request, urllib.error
+
+
+def send(url, method, body=b"", headers=None):
+    request = urllib.request.Request(url, data=body or None, method=method, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("payloads", help="file with one webhook JSON body per line")
+    parser.add_argument("--url", default="http://localhost:8765/", help="display's webhook listener")
+    parser.add_argument("--list-id", default="", help="substituted for {LIST_ID} in payloads")
+    parser.add_argument("--delay", type=float, default=1.0, help="seconds between callbacks")
+    parser.add_argument("--secret", help="API_SECRET, to sign callbacks like Trello does")
+    parser.add_argument("--callback-url", help="WEBHOOK_CALLBACK_URL the display checks signatures against")
+    args = parser.parse_args()
+
+    # Trello checks the callback with HEAD before it sends anything
+    print(f"HEAD {args.url} -> {send(args.url, 'HEAD')}")
+
+    with open(args.payloads, "rb") as f:
+        bodies = [line.strip() for line in f if line.strip()]
+    for body in bodies:
+        body = body.replace(b"{LIST_ID}", args.list_id.encode())
+        headers = {"Content-Type": "application/json"}
+        if args.secret:
+            callback = (args.callback_url or args.url).encode()
+            digest = hmac.new(args.secret.encode(), body + callback, hashlib.sha1).digest()
+            headers["X-Trello-Webhook"] = base64.b64encode(digest).decode()
+        print(f"POST {body[:70].decode(errors='replace')}... -> {send(args.url, 'POST', body, headers)}")
+        time.sleep(args.delay)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,13 @@
 #  • Each card appears in a dark rounded rectangle that
 #    grows vertically if text wraps to multiple lines.
 # ------------------------------------------------------------
-import pygame, requests, time, sys
+import time
+BOOT_T0 = time.perf_counter()  # Startup timing includes the (slow) pygame import
+import pygame, requests, sys
+import threading, queue, json, bisect, heapq, math, functools, itertools, calendar, collections
+import concurrent.futures
+import http.server, hmac, hashlib, base64, socket, urllib.parse
+import socketserver, struct, tempfile
 
 # add to top (after imports)
 from pathlib import Path
@@ -15,163 +21,2140 @@ import os
 
 load_dotenv(Path(__file__).with_name("trello_secrets.env"))
 
+# ---------- startup timing ------------------------------------------------
+# Seconds from launch to each startup phase, reported once the first frame
+# is on screen and the first fetch has landed, and appended to
+# boot_timing.jsonl so boot-to-first-frame can be tracked across releases.
+BOOT_PHASES     = ("import", "display init", "font load", "first flip", "first fetch")
+BOOT_TIMING_LOG = Path(__file__).with_name("boot_timing.jsonl")
+boot_marks = {}
+
+def mark_boot(phase):
+    if phase in boot_marks:
+        return
+    boot_marks[phase] = time.perf_counter() - BOOT_T0
+    if phase == "first flip" and hasattr(time, "CLOCK_BOOTTIME"):
+        boot_marks["system uptime at first flip"] = time.clock_gettime(time.CLOCK_BOOTTIME)
+    if all(p in boot_marks for p in BOOT_PHASES):
+        print("Startup: " + ", ".join(f"{p} {boot_marks[p]:.2f}s" for p in BOOT_PHASES))
+        try:
+            with open(BOOT_TIMING_LOG, "a") as f:
+                f.write(json.dumps({"at": time.time(), **{p: round(t, 3) for p, t in boot_marks.items()}}) + "\n")
+        except OSError as e:
+            print(f"Error writing {BOOT_TIMING_LOG}: {e}")
+
+mark_boot("import")
+
 API_KEY   = os.environ.get("API_KEY")
 API_TOKEN = os.environ.get("API_TOKEN")
 LIST_ID   = os.environ.get("LIST_ID")
+# Several lists (comma-separated) are shown one after another, each under a header
+LIST_IDS  = [l.strip() for l in os.environ.get("LIST_IDS", LIST_ID or "").split(",") if l.strip()]
+
+# Optional webhook mode (see "Webhook mode" in README.md)
+WEBHOOK_PORT         = int(os.environ.get("WEBHOOK_PORT", "0"))   # 0 = polling only
+WEBHOOK_CALLBACK_URL = os.environ.get("WEBHOOK_CALLBACK_URL")     # Public URL Trello should call
+API_SECRET           = os.environ.get("API_SECRET")               # Verifies webhook signatures if set
+WEBHOOK_RECORD       = os.environ.get("WEBHOOK_RECORD")           # Append raw callbacks here (JSON lines)
+
+# Optional shared sync for several screens (see "Several screens" in README.md)
+SYNC_SOCKET = os.environ.get("SYNC_SOCKET")   # Unix socket of the sync daemon; unset = sync on our own
+
+# Testing against a fake Trello (see "Soak testing" in README.md)
+TRELLO_API    = os.environ.get("TRELLO_API", "https://api.trello.com/1").rstrip("/")
+TRELLO_RECORD = os.environ.get("TRELLO_RECORD")   # Append card fetches and writes here (JSON lines)
+
+# Optional metrics (see "Metrics" in README.md)
+METRICS_PATH     = os.environ.get("METRICS_PATH")                 # *.prom = Prometheus text, else JSON lines
+METRICS_INTERVAL = int(os.environ.get("METRICS_INTERVAL", "60"))  # Seconds between dumps
+METRICS_HUD      = os.environ.get("METRICS_HUD") == "1"           # Start with the overlay shown ('h' toggles)
+
+# ---------- metrics -------------------------------------------------------
+# Histograms of frame time per phase (main thread) and of Trello request
+# latency per operation (worker threads), shown by the HUD and dumped to
+# METRICS_PATH for collection across displays.
+FRAME_BUCKETS   = (0.001, 0.002, 0.004, 0.008, 0.016, 0.033, 0.066, 0.133, 0.25)  # Seconds
+REQUEST_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)                      # Seconds
+FRAME_PHASES    = ("events", "fetch", "list", "modal", "hud", "flip", "total")
+REQUEST_OPS     = ("fetch", "archive", "unarchive")
+
+metrics_lock    = threading.Lock()
+frame_metrics   = {}  # phase -> histogram
+request_metrics = {}  # op -> histogram, plus 'errors'
+
+def new_histogram(bounds):
+    # counts[i] holds observations <= bounds[i]; the last slot is +Inf
+    return {'bounds': bounds, 'counts': [0] * (len(bounds) + 1), 'sum': 0.0, 'count': 0}
+
+def observe(hist, value):
+    hist['counts'][bisect.bisect_left(hist['bounds'], value)] += 1
+    hist['sum'] += value
+    hist['count'] += 1
+
+for _phase in FRAME_PHASES:
+    frame_metrics[_phase] = new_histogram(FRAME_BUCKETS)
+for _op in REQUEST_OPS:
+    request_metrics[_op] = {**new_histogram(REQUEST_BUCKETS), 'errors': 0, 'last': None}
+
+def record_request(op, seconds, ok):
+    """Count one Trello call for the latency/error histograms."""
+    with metrics_lock:
+        hist = request_metrics[op]
+        observe(hist, seconds)
+        hist['last'] = seconds
+        if not ok:
+            hist['errors'] += 1
+
+def metrics_prometheus():
+    """Return all histograms in the Prometheus text format."""
+    out = []
+    def histogram(name, label, key, hist):
+        cumulative = 0
+        for bound, count in zip(hist['bounds'] + ("+Inf",), hist['counts']):
+            cumulative += count
+            out.append(f'{name}_bucket{{{label}="{key}",le="{bound}"}} {cumulative}')
+        out.append(f'{name}_sum{{{label}="{key}"}} {hist["sum"]:.6f}')
+        out.append(f'{name}_count{{{label}="{key}"}} {hist["count"]}')
+    out.append("# TYPE trello_display_frame_seconds histogram")
+    for phase, hist in frame_metrics.items():
+        histogram("trello_display_frame_seconds", "phase", phase, hist)
+    out.append("# TYPE trello_display_request_seconds histogram")
+    for op, hist in request_metrics.items():
+        histogram("trello_display_request_seconds", "op", op, hist)
+    out.append("# TYPE trello_display_request_errors_total counter")
+    for op, hist in request_metrics.items():
+        out.append(f'trello_display_request_errors_total{{op="{op}"}} {hist["errors"]}')
+    return "\n".join(out) + "\n"
+
+def metrics_record():
+    """Return all histograms as one JSON-serialisable dict."""
+    def plain(hist):
+        return {k: hist[k] for k in ('bounds', 'counts', 'sum', 'count', 'errors') if k in hist}
+    return {'at': time.time(), 'host': socket.gethostname(),
+            'frame': {phase: plain(h) for phase, h in frame_metrics.items()},
+            'request': {op: plain(h) for op, h in request_metrics.items()}}
+
+def dump_metrics():
+    path = Path(METRICS_PATH)
+    try:
+        with metrics_lock:
+            if path.suffix == ".prom":
+                text = metrics_prometheus()
+            else:
+                text = json.dumps(metrics_record(), separators=(",", ":")) + "\n"
+        if path.suffix == ".prom":
+            # Replaced whole, as node_exporter's textfile collector expects
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_text(text)
+            os.replace(tmp, path)
+        else:
+            with open(path, "a") as f:
+                f.write(text)
+    except OSError as e:
+        print(f"Error writing metrics to {path}: {e}")
+
+def metrics_worker():
+    while True:
+        time.sleep(METRICS_INTERVAL)
+        dump_metrics()
+
+def start_metrics_worker():
+    threading.Thread(target=metrics_worker, name="metrics-dump", daemon=True).start()
+
+
+# ---------- card records --------------------------------------------------
+# Every card on screen, in the cache and in each list's last snapshot is a
+# Card. Lists of hundreds of them are kept per list and compared on every
+# refresh, so a card is a small slotted record compared and hashed by value.
+# Treat one as immutable: with_changes() returns an edited copy.
+TRELLO_LABEL_COLORS = {
+    "green": (75, 206, 151), "yellow": (245, 205, 71), "orange": (254, 163, 98),
+    "red": (248, 113, 104), "purple": (159, 143, 239), "blue": (87, 157, 255),
+    "sky": (108, 195, 224), "lime": (148, 199, 72), "pink": (232, 114, 188),
+    "black": (140, 155, 171),
+}  # Trello's label palette; "green_dark", "red_light" etc. use the base colour
+THUMB_SOURCE_WIDTH = 150  # Smallest cover preview (pixels wide) worth scaling down from
+
+class Card:
+    __slots__ = ('id', 'name', 'labels', 'due', 'cover')
+
+    def __init__(self, id, name, labels=(), due=None, cover=None):
+        self.id     = id      # Trello card id; "" or ":..." for the display's own pseudo-cards
+        self.name   = name
+        self.labels = labels  # Tuple of label colour names, in Trello's order
+        self.due    = due     # ISO 8601 due date, None if unset or marked complete
+        self.cover  = cover   # URL of the cover image preview to thumbnail, or None
+
+    @classmethod
+    def from_trello(cls, c):
+        """Build a Card from a card in Trello's JSON (see request_cards() for the fields)."""
+        labels = tuple(l["color"] for l in c.get("labels") or () if l.get("color"))
+        due = None if c.get("dueComplete") else c.get("due")
+        return cls(c["id"], c["name"], labels, due, cover_preview_url(c))
+
+    @classmethod
+    def from_json(cls, data):
+        card_id, name, labels, due, cover = data
+        return cls(card_id, name, tuple(labels), due, cover)
+
+    def to_json(self):
+        return [self.id, self.name, list(self.labels), self.due, self.cover]
+
+    def with_changes(self, **changes):
+        fields = {k: getattr(self, k) for k in self.__slots__}
+        fields.update(changes)
+        return Card(**fields)
+
+    def _key(self):
+        return (self.id, self.name, self.labels, self.due, self.cover)
+
+    def __eq__(self, other):
+        return isinstance(other, Card) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f"Card({self.id!r}, {self.name!r})"
+
+def cover_preview_url(c):
+    """URL of the smallest preview of a card's cover image that is at least
+    THUMB_SOURCE_WIDTH wide (the largest if none is), or None."""
+    cover = next((a for a in c.get("attachments") or () if a.get("id") == c.get("idAttachmentCover")), None)
+    previews = sorted((p for p in (cover or {}).get("previews") or () if p.get("url")),
+                      key=lambda p: p.get("width") or 0)
+    if not previews:
+        return None
+    return next((p for p in previews if (p.get("width") or 0) >= THUMB_SOURCE_WIDTH), previews[-1])["url"]
+
+def label_color(name):
+    return TRELLO_LABEL_COLORS.get(name.split("_")[0], (140, 155, 171))
+
+def format_due(due):
+    """Render an ISO 8601 due date in local time, e.g. "Due Mar 14 17:00"."""
+    try:
+        t = calendar.timegm(time.strptime(due[:19], "%Y-%m-%dT%H:%M:%S")) # Trello sends UTC
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return "Due " + time.strftime("%b %d %H:%M", time.localtime(t))
 
 
 # ---------- Trello helpers ------------------------------≠≠-------------------
-def fetch_cards():
-    """Return list of (card_id, card_name) tuples from the Trello list."""
-    url = f"https://api.trello.com/1/lists/{LIST_ID}/cards"
-    params = {"fields": "name,closed", "key": API_KEY, "token": API_TOKEN}
+FULL_SYNC_SECS = 900                             # Full pull at least this often, even if nothing looks changed
+
+# One keep-alive session for all Trello traffic, so polls reuse the TLS
+# connections; its pool holds one connection per list polled in parallel.
+session = requests.Session()
+for _scheme in ("https://", "http://"): # http:// for a local fake Trello
+    session.mount(_scheme, requests.adapters.HTTPAdapter(pool_maxsize=max(10, len(LIST_IDS) + 2)))
+fetch_pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(LIST_IDS)),
+                                                   thread_name_prefix="trello-poll")
+
+# ---------- Trello client -------------------------------------------------
+# Every Trello API call goes through trello_client, shared by all threads:
+#  • a token bucket spaces out bursts (a refresh plus a few quick archives)
+#    to stay under Trello's limits; each reply's x-rate-limit-* headers
+#    resize it, and a 429 empties it for a while;
+#  • identical GETs in flight at the same time are sent once and share the reply;
+#  • batch_get() folds several GETs into one /1/batch call (Trello batches
+#    GETs only, so archives and unarchives still go one by one);
+#  • after repeated failures a circuit breaker fails calls at once for a
+#    growing cooldown, so polling and retries back off while Trello is down.
+RATE_LIMIT_REQUESTS  = 100    # Per token per RATE_LIMIT_INTERVAL, until the headers say otherwise
+RATE_LIMIT_INTERVAL  = 10.0   # Seconds
+BATCH_MAX_URLS       = 10     # Trello's limit per /1/batch call
+BREAKER_THRESHOLD    = 5      # Failures in a row that open the circuit
+BREAKER_COOLDOWN     = 30     # Seconds it first stays open, doubling on each failed trial...
+BREAKER_MAX_COOLDOWN = 600    # ...up to this
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of calling Trello while the circuit breaker is open."""
+
+class TrelloClient:
+    def __init__(self, session):
+        self.session    = session
+        self.cond       = threading.Condition()  # Guards everything below
+        self.capacity   = RATE_LIMIT_REQUESTS
+        self.rate       = RATE_LIMIT_REQUESTS / RATE_LIMIT_INTERVAL  # Tokens per second
+        self.tokens     = float(self.capacity)
+        self.refilled   = time.monotonic()
+        self.paused_until = 0.0    # No requests before this, after a 429
+        self.in_flight  = {}       # GET key -> Future of its response
+        self.failures   = 0        # Failed calls in a row
+        self.open_until = 0.0      # Circuit open (calls fail fast) until this
+        self.cooldown   = BREAKER_COOLDOWN
+        self.trial      = False    # A trial call is testing a half-open circuit
+
+    # ---------- token bucket ----------
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.refilled) * self.rate)
+        self.refilled = now
+
+    def acquire(self, n=1):
+        """Block until n more requests may be sent (worker threads only)."""
+        with self.cond:
+            n = min(n, self.capacity)
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if self.tokens >= n:
+                        self.tokens -= n
+                        return
+                    wait = (n - self.tokens) / self.rate
+                self.cond.wait(wait)
+
+    def read_limits(self, response):
+        """Resize the bucket from Trello's rate-limit headers, the stricter of the
+        per-token and per-key limits, and pause after a 429."""
+        headers, now = response.headers, time.monotonic()
+        with self.cond:
+            self._refill(now)
+            for scope in ("api-token", "api-key"):
+                try:
+                    limit     = int(headers[f"x-rate-limit-{scope}-max"])
+                    interval  = int(headers[f"x-rate-limit-{scope}-interval-ms"]) / 1000
+                    remaining = int(headers[f"x-rate-limit-{scope}-remaining"])
+                except (KeyError, ValueError):
+                    continue
+                if scope == "api-token" or limit / interval < self.rate:
+                    self.capacity, self.rate = limit, limit / interval
+                self.tokens = min(self.tokens, remaining)
+            if response.status_code == 429:
+                retry_after = headers.get("Retry-After", "")
+                delay = float(retry_after) if retry_after.isdigit() else RATE_LIMIT_INTERVAL
+                self.tokens = 0.0
+                self.paused_until = max(self.paused_until, now + delay)
+                print(f"Trello rate limit hit; pausing requests for {delay:g}s")
+            self.cond.notify_all()
+
+    # ---------- circuit breaker ----------
+    def check_circuit(self):
+        """Raise CircuitOpenError if no call may be sent now. Return True if
+        this call is the half-open circuit's trial."""
+        with self.cond:
+            now = time.monotonic()
+            if now < self.open_until:
+                raise CircuitOpenError(f"Trello unreachable, retrying in {self.open_until - now:.0f}s")
+            if self.failures >= BREAKER_THRESHOLD:
+                if self.trial: # Half open: one call at a time finds out if Trello is back
+                    raise CircuitOpenError("Trello unreachable, retrying")
+                self.trial = True
+                return True
+            return False
+
+    def record_outcome(self, ok, trial=False):
+        with self.cond:
+            if trial: # Only the trial itself frees the slot; calls sent earlier may finish first
+                self.trial = False
+            if ok:
+                if self.failures >= BREAKER_THRESHOLD:
+                    print("Trello reachable again")
+                self.failures, self.cooldown = 0, BREAKER_COOLDOWN
+                return
+            self.failures += 1
+            if self.failures >= BREAKER_THRESHOLD:
+                self.open_until = time.monotonic() + self.cooldown
+                print(f"Trello failing ({self.failures} calls in a row); pausing calls for {self.cooldown}s")
+                self.cooldown = min(self.cooldown * 2, BREAKER_MAX_COOLDOWN)
+
+    def blocked_for(self):
+        """Seconds until the circuit lets calls through again (0 if closed)."""
+        with self.cond:
+            return max(0.0, self.open_until - time.monotonic())
+
+    # ---------- calls ----------
+    def request(self, method, url, cost=1, timeout=10, **kwargs):
+        """Send one request, paced and guarded. Raises like requests does,
+        or CircuitOpenError without sending anything."""
+        trial = self.check_circuit()
+        try:
+            self.acquire(cost)
+            response = self.session.request(method, url, timeout=timeout, **kwargs)
+        except Exception:
+            self.record_outcome(False, trial)
+            raise
+        self.read_limits(response)
+        self.record_outcome(response.status_code < 500, trial) # 4xx (and 429) mean Trello is up
+        return response
+
+    def get(self, url, params=None, headers=None, timeout=10):
+        """GET, sharing the reply with any identical GET already in flight."""
+        key = (url, tuple(sorted((params or {}).items())), tuple(sorted((headers or {}).items())))
+        with self.cond:
+            future = self.in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self.in_flight[key] = concurrent.futures.Future()
+        if not owner:
+            return future.result()
+        try:
+            response = self.request("GET", url, params=params, headers=headers, timeout=timeout)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            with self.cond:
+                del self.in_flight[key]
+
+    def put(self, url, params=None, timeout=10):
+        return self.request("PUT", url, params=params, timeout=timeout)
+
+    def post(self, url, params=None, timeout=10):
+        return self.request("POST", url, params=params, timeout=timeout)
+
+    def batch_get(self, routes):
+        """GET several API routes, given as (path, params) with paths like
+        "/lists/<id>", in as few calls as Trello allows. Return a
+        (status, body) pair per route, in order; raise if a batch call fails."""
+        results = []
+        for i in range(0, len(routes), BATCH_MAX_URLS):
+            chunk = routes[i:i + BATCH_MAX_URLS]
+            # The routes are comma-separated, so each is encoded whole, on top
+            # of its own query's encoding, to keep the commas in fields=a,b
+            urls = ",".join(urllib.parse.quote(path + "?" + urllib.parse.urlencode(params), safe="/")
+                            for path, params in chunk)
+            response = self.request("GET", f"{TRELLO_API}/batch?urls={urls}", cost=len(chunk),
+                                    params={"key": API_KEY, "token": API_TOKEN})
+            response.raise_for_status()
+            for item in response.json():
+                # Each reply is {"<status>": body}, or an error object with a statusCode
+                status = next((k for k in item if k.isdigit()), None) if isinstance(item, dict) else None
+                if status:
+                    results.append((int(status), item[status]))
+                else:
+                    results.append((item.get("statusCode", 500) if isinstance(item, dict) else 500, None))
+        return results
+
+trello_client = TrelloClient(session)
+
+# What the last successful full pull of each list saw, for conditional requests and the activity probe
+sync_state = {list_id: {'etag': None, 'last_modified': None, 'board_id': None,
+                        'board_activity': None, 'last_full_sync': 0.0}
+              for list_id in LIST_IDS}
+list_names = {}  # list_id -> list name, for the section headers
+
+# Only the cover attachment, and only its previews' sizes and URLs: the
+# images themselves are downloaded later, in the background (see thumbnails).
+CARD_PARAMS = {"fields": "name,closed,labels,due,dueComplete,idAttachmentCover",
+               "attachments": "cover", "attachment_fields": "previews"}
+
+record_lock = threading.Lock()
+
+def record_traffic(op, **fields):
+    """Append one Trello exchange to TRELLO_RECORD, for tools/fake_trello.py --replay."""
+    if not TRELLO_RECORD:
+        return
+    line = json.dumps({"at": time.time(), "op": op, **fields}, separators=(",", ":")) + "\n"
+    try:
+        with record_lock, open(TRELLO_RECORD, "a") as f:
+            f.write(line)
+    except OSError as e:
+        print(f"Error recording Trello traffic: {e}")
+
+def request_cards(list_id, conditional=False):
+    """GET a list's open cards as Cards, raising on failure.
+    With conditional=True, return None if the server says they have not changed."""
+    state = sync_state[list_id]
+    url = f"{TRELLO_API}/lists/{list_id}/cards"
+    params = {**CARD_PARAMS, "key": API_KEY, "token": API_TOKEN}
+    headers = {}
+    if conditional and state['etag']:
+        headers["If-None-Match"] = state['etag']
+    if conditional and state['last_modified']:
+        headers["If-Modified-Since"] = state['last_modified']
+    response = trello_client.get(url, params=params, headers=headers)
+    if response.status_code == 304:
+        record_traffic("fetch", list_id=list_id, status=304)
+        return None
+    if response.status_code != 200:
+        record_traffic("fetch", list_id=list_id, status=response.status_code)
+    response.raise_for_status()
+    raw = response.json()
+    record_traffic("fetch", list_id=list_id, status=200, cards=raw)
+    state['etag'] = response.headers.get("ETag")
+    state['last_modified'] = response.headers.get("Last-Modified")
+    return open_cards(raw)
+
+def open_cards(raw):
+    return [Card.from_trello(c) for c in raw if not c.get("closed")]
+
+def fetch_list_infos():
+    """Look up each list's board (for the activity probe) and name (for its
+    header), once, in one batch call."""
+    missing = [l for l in LIST_IDS if not sync_state[l]['board_id']]
+    if not missing:
+        return
     try:
-        data = requests.get(url, params=params, timeout=10).json()
-        return [(c["id"], c["name"]) for c in data if not c.get("closed")]
+        replies = trello_client.batch_get([(f"/lists/{l}", {"fields": "idBoard,name"}) for l in missing])
     except Exception as e:
-        return [("", f"Error: {e}")]
-
-def archive_card(card_id):
-    """Archive a card in Trello."""
-    url = f"https://api.trello.com/1/cards/{card_id}"
-    params = {"key": API_KEY, "token": API_TOKEN, "closed": "true"}
+        print(f"List lookup failed: {e}")
+        return
+    for list_id, (status, info) in zip(missing, replies):
+        if status != 200:
+            print(f"List lookup failed for {list_id}: HTTP {status}")
+            continue
+        sync_state[list_id]['board_id'] = info["idBoard"]
+        list_names[list_id] = info.get("name") or list_names.get(list_id)
+
+def fetch_board_activity(board_ids):
+    """Return {board_id: dateLastActivity} for the boards that could be probed."""
+    board_ids = sorted(board_ids)
+    if not board_ids:
+        return {}
     try:
-        response = requests.put(url, params=params, timeout=10)
-        return response.status_code == 200
+        replies = trello_client.batch_get([(f"/boards/{b}", {"fields": "dateLastActivity"})
+                                           for b in board_ids])
     except Exception as e:
-        print(f"Error archiving card: {e}")
-        return False
-
-def unarchive_card(card_id):
-    """Unarchive a card in Trello."""
-    url = f"https://api.trello.com/1/cards/{card_id}"
-    params = {"key": API_KEY, "token": API_TOKEN, "closed": "false"}
+        print(f"Board activity probe failed: {e}")
+        return {}
+    return {b: body.get("dateLastActivity") for b, (status, body) in zip(board_ids, replies)
+            if status == 200}
+
+def poll_mode(list_id, full, activity):
+    """How to poll one list: None if its board shows no activity since its
+    last successful poll, else 'full' or 'conditional'. full=True skips
+    every shortcut."""
+    state = sync_state[list_id]
+    if full or time.time() - state['last_full_sync'] > FULL_SYNC_SECS:
+        return 'full'
+    if activity and activity == state['board_activity']:
+        return None
+    return 'conditional'
+
+def mark_polled(list_id, activity, full):
+    """Remember a successful poll. Until then a list's sync_state is left
+    alone, so the next poll pulls it again."""
+    state = sync_state[list_id]
+    state['board_activity'] = activity
+    if full:
+        state['last_full_sync'] = time.time()
+
+def batch_full_pulls(list_ids):
+    """Pull several lists in full with one batch call. Return {list_id: cards
+    or the exception it failed with}. Batch replies carry no ETag, so the
+    next conditional pull of these lists downloads them once more."""
     try:
-        response = requests.put(url, params=params, timeout=10)
-        return response.status_code == 200
+        replies = trello_client.batch_get([(f"/lists/{l}/cards", CARD_PARAMS) for l in list_ids])
     except Exception as e:
-        print(f"Error unarchiving card: {e}")
-        return False
+        return dict.fromkeys(list_ids, e)
+    results = {}
+    for list_id, (status, raw) in zip(list_ids, replies):
+        if status != 200:
+            record_traffic("fetch", list_id=list_id, status=status)
+            results[list_id] = requests.HTTPError(f"HTTP {status} for list {list_id}")
+            continue
+        record_traffic("fetch", list_id=list_id, status=200, cards=raw)
+        sync_state[list_id]['etag'] = sync_state[list_id]['last_modified'] = None
+        results[list_id] = open_cards(raw)
+    return results
+
+def poll_cards(full=False):
+    """Poll every list in LIST_IDS at once over the shared client. Return
+    {list_id: cards, None if unchanged, or the exception it failed with}."""
+    fetch_list_infos()
+    # Probe each board once (lists often share one) before pulling, so
+    # activity during the pulls below is caught next time
+    activity = fetch_board_activity({sync_state[l]['board_id'] for l in LIST_IDS
+                                     if sync_state[l]['board_id']})
+    activity = {l: activity.get(sync_state[l]['board_id']) for l in LIST_IDS}
+    modes = {l: poll_mode(l, full, activity[l]) for l in LIST_IDS}
+
+    results = {l: None for l, mode in modes.items() if mode is None}
+    pulls = [l for l, mode in modes.items() if mode == 'full']
+    if len(pulls) > 1:
+        results.update(batch_full_pulls(pulls))
+        pulls = []
+    # Conditional pulls go one by one: only a plain GET gets its 304
+    pulls += [l for l, mode in modes.items() if mode == 'conditional']
+
+    def pull(list_id):
+        try:
+            return request_cards(list_id, conditional=modes[list_id] == 'conditional')
+        except Exception as e:
+            return e
+    results.update(zip(pulls, fetch_pool.map(pull, pulls)))
+    for list_id, result in results.items():
+        if modes[list_id] and not isinstance(result, Exception):
+            mark_polled(list_id, activity[list_id], modes[list_id] == 'full')
+    return {l: results[l] for l in LIST_IDS}
+
+def set_card_closed(card_id, closed):
+    """Set a card's closed flag in Trello. Return the HTTP status, or None on network error."""
+    url = f"{TRELLO_API}/cards/{card_id}"
+    params = {"key": API_KEY, "token": API_TOKEN, "closed": "true" if closed else "false"}
+    op = "archive" if closed else "unarchive"
+    t0 = time.perf_counter()
+    try:
+        status = trello_client.put(url, params=params).status_code
+    except Exception as e:
+        record_request(op, time.perf_counter() - t0, False)
+        record_traffic(op, card_id=card_id, status=None, error=str(e))
+        print(f"Error {'archiving' if closed else 'unarchiving'} card: {e}")
+        return None
+    record_request(op, time.perf_counter() - t0, status == 200)
+    record_traffic(op, card_id=card_id, status=status)
+    return status
+
+def write_json_atomic(path, data):
+    """Write data as JSON so a power cut leaves either the old or the new file.
+    Each call writes its own temporary file, so threads cannot mix their writes."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with open(fd, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+# ---------- outbound write queue ------------------------------------------
+# Archive/unarchive taps never wait on the network. They are appended to a
+# small journal on disk and a worker thread sends them in order, retrying
+# with exponential backoff, so writes survive dropped Wi-Fi and reboots.
+# Nor do they wait on the disk: a thread of its own rewrites the journal
+# whenever the queue changes, a few milliseconds after the tap.
+OUTBOX_PATH        = Path(__file__).with_name("pending_writes.json")
+OUTBOX_MAX_BACKOFF = 300                      # Seconds between retries, at most
+
+outbox_cond       = threading.Condition()
+outbox            = []       # [{'card_id', 'closed', 'queued_at'}], oldest first
+outbox_in_flight  = None     # The command currently being sent, if any
+outbox_dirty      = False    # The queue changed since the journal was last written
+outbox_save_lock  = threading.Lock()  # One journal write at a time, in order
+last_write_landed = 0.0      # When the worker last finished a write
+
+def load_outbox():
+    """Reload commands journalled by a previous run."""
+    try:
+        with open(OUTBOX_PATH) as f:
+            outbox.extend(json.load(f))
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable write journal {OUTBOX_PATH}: {e}")
+
+def mark_outbox_dirty():
+    # Caller holds outbox_cond.
+    global outbox_dirty
+    outbox_dirty = True
+    outbox_cond.notify_all()
+
+def save_outbox():
+    """Write the queue to the journal if it changed since the last write."""
+    global outbox_dirty
+    with outbox_save_lock:
+        with outbox_cond:
+            if not outbox_dirty:
+                return
+            outbox_dirty = False
+            data = [dict(cmd) for cmd in outbox]
+        try:
+            write_json_atomic(OUTBOX_PATH, data)
+        except OSError as e:
+            print(f"Error saving write journal: {e}")
+
+def outbox_journal_worker():
+    while True:
+        with outbox_cond:
+            while not outbox_dirty:
+                outbox_cond.wait()
+        save_outbox()
+
+def queue_card_write(card_id, closed):
+    """Queue an archive (closed=True) or unarchive (closed=False) of a card."""
+    if sync_role == 'client':
+        send_sync_command(card_id, closed) # The sync daemon journals and sends it
+        return
+    with outbox_cond:
+        for cmd in outbox:
+            if cmd['card_id'] == card_id and cmd is not outbox_in_flight:
+                if cmd['closed'] and not closed:
+                    # An unsent archive followed by an unarchive leaves the
+                    # card open, as it was: drop both.
+                    outbox.remove(cmd)
+                    mark_outbox_dirty()
+                elif closed and not cmd['closed']:
+                    # The reverse is not a no-op: undo queues an unarchive
+                    # whether or not an archive was sent, so the card may be
+                    # open already. The archive replaces it.
+                    cmd['closed'] = True
+                    mark_outbox_dirty()
+                return
+        outbox.append({'card_id': card_id, 'closed': closed, 'queued_at': time.time()})
+        mark_outbox_dirty() # Also wakes outbox_worker
+
+def pending_card_states():
+    """Return {card_id: closed} for writes that have not reached Trello yet
+    (or, on a sync client, the sync daemon)."""
+    with outbox_cond:
+        states = {cmd['card_id']: cmd['closed'] for cmd in outbox}
+    with sync_send_lock:
+        states.update((cmd['card_id'], cmd['closed']) for cmd in sync_unacked.values())
+    return states
+
+def outbox_worker():
+    """Send queued writes oldest first, backing off while Trello is unreachable."""
+    global outbox_in_flight, last_write_landed
+    backoff = 1
+    while True:
+        with outbox_cond:
+            while not outbox:
+                outbox_cond.wait()
+            cmd = outbox_in_flight = outbox[0]
+
+        status = set_card_closed(cmd['card_id'], cmd['closed'])
+
+        if status is None or status == 429 or status >= 500:
+            with outbox_cond:
+                outbox_in_flight = None
+            print(f"Write for card {cmd['card_id']} failed ({status}); retrying in {backoff}s")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, OUTBOX_MAX_BACKOFF)
+            continue
 
-# ---------- Pygame initialisation ----------------------------------------
-pygame.init()
+        if status != 200:
+            # e.g. 404 for a card deleted elsewhere: retrying will not help.
+            print(f"Dropping write for card {cmd['card_id']}: HTTP {status}")
+        with outbox_cond:
+            outbox_in_flight = None
+            outbox[:] = [c for c in outbox if c is not cmd]
+            mark_outbox_dirty()
+            last_write_landed = time.time()
+        backoff = 1
+
+def start_outbox_worker():
+    load_outbox()
+    threading.Thread(target=outbox_worker, name="trello-outbox", daemon=True).start()
+    threading.Thread(target=outbox_journal_worker, name="outbox-journal", daemon=True).start()
+
+# ---------- list sections -------------------------------------------------
+# With several lists, each list's cards follow a header pseudo-card with its
+# name. A list that cannot be fetched keeps its last cards (its header says
+# since when) or shows an error card, without affecting the other lists.
+# Pseudo-card ids start with ":", which Trello ids never do, and are never
+# tappable or sent to Trello.
+SECTION_ID = ":section:"
+ERROR_ID   = ":error:"
+
+def is_real_card(card_id):
+    return bool(card_id) and not card_id.startswith(":")
+
+def is_section_header(card_id):
+    return card_id.startswith(SECTION_ID)
+
+def format_sync_time(since):
+    fmt = "%H:%M" if time.time() - since < 86400 else "%b %d %H:%M"
+    return time.strftime(fmt, time.localtime(since))
+
+def merge_lists(lists, synced, errors):
+    """Flatten {list_id: [Card]} into the list of Cards shown on screen. synced holds when each list was last known current and errors
+    why the lists that failed to fetch did."""
+    if not LIST_IDS:
+        return [Card("", "Error: set LIST_ID (or LIST_IDS) in trello_secrets.env")]
+    if len(LIST_IDS) == 1: # A single list is shown as it is, without a header
+        list_id = LIST_IDS[0]
+        if list_id in lists:
+            return lists[list_id]
+        return [Card("", f"Error: {errors.get(list_id, 'not loaded yet')}")]
+    cards = []
+    for list_id in LIST_IDS:
+        title = list_names.get(list_id) or list_id
+        if list_id in errors and list_id in lists:
+            title += f"  (last synced {format_sync_time(synced[list_id])})"
+        cards.append(Card(SECTION_ID + list_id, title))
+        if list_id in lists:
+            cards.extend(lists[list_id])
+        else:
+            cards.append(Card(ERROR_ID + list_id, f"Error: {errors.get(list_id, 'not loaded yet')}"))
+    return cards
+
+def make_snapshot(lists, synced, errors, started_at, stale_since=None):
+    """Build the snapshot handed to the main loop. 'error' marks one with no
+    cards from any list, only error cards."""
+    return {'cards': merge_lists(lists, synced, errors), 'lists': lists, 'synced': synced,
+            'errors': errors, 'started_at': started_at, 'stale_since': stale_since,
+            'error': not lists}
+
+# ---------- snapshot cache ------------------------------------------------
+# The last good cards of each list are kept on disk so a reboot shows them on
+# the very first frame (marked stale) while the live fetch runs, even with no
+# network.
+CARDS_CACHE_PATH    = Path(__file__).with_name("cards_cache.json")
+CARDS_CACHE_VERSION = 3
+
+def save_cards_cache(lists, synced, saved_at):
+    try:
+        write_json_atomic(CARDS_CACHE_PATH, {"version": CARDS_CACHE_VERSION, "saved_at": saved_at,
+                                             "list_ids": LIST_IDS, "names": list_names,
+                                             "lists": {list_id: [c.to_json() for c in cards]
+                                                       for list_id, cards in lists.items()},
+                                             "synced": synced})
+    except OSError as e:
+        print(f"Error saving card cache: {e}")
+
+def load_cards_cache():
+    """Return a snapshot of the cached lists, marked stale, or None if there is no usable cache."""
+    try:
+        with open(CARDS_CACHE_PATH) as f:
+            data = json.load(f)
+        if data.get("version") == CARDS_CACHE_VERSION and data.get("list_ids") == LIST_IDS:
+            list_names.update(data["names"])
+            lists = {list_id: [Card.from_json(c) for c in cards] for list_id, cards in data["lists"].items()}
+            synced = data["synced"]
+            if lists:
+                return make_snapshot(lists, synced, {}, data["saved_at"], min(synced.values()))
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        print(f"Ignoring unreadable card cache {CARDS_CACHE_PATH}: {e}")
+    return None
+
+# ---------- background fetcher --------------------------------------------
+# The render loop never waits on Trello. A daemon thread polls the list and
+# hands finished snapshots to the main loop through snapshot_queue; the loop
+# swaps them into `tasks` between frames.
+snapshot_queue  = queue.Queue()
+fetch_requested = threading.Event()   # set() to poll now instead of waiting REFRESH_SECS
+full_fetch_requested = False          # Next poll skips the unchanged-list shortcuts
+SNAPSHOT_READY  = pygame.USEREVENT + 1  # Posted to wake an idle main loop
+WEBHOOK_FALLBACK_SECS = 900           # Poll interval once webhooks deliver changes
+
+snapshot_lock   = threading.RLock()   # Also held across a webhook's read, apply and publish
+latest_snapshot = None                # Last snapshot published, the base for webhook updates
+last_webhook_at = 0.0                 # When a webhook last changed latest_snapshot
+
+def publish_snapshot(lists, synced, errors, started_at, stale_since=None):
+    """Hand the lists to the main loop and wake it. stale_since is when the
+    cards were last known current, if Trello cannot be reached right now."""
+    global latest_snapshot
+    snapshot = make_snapshot(lists, synced, errors, started_at, stale_since)
+    with snapshot_lock:
+        latest_snapshot = snapshot
+        snapshot_queue.put(snapshot)
+        if pygame.display.get_init(): # The sync daemon has no display (or main loop) to wake
+            pygame.event.post(pygame.event.Event(SNAPSHOT_READY))
+        if lists and stale_since is None: # Saved in publishing order, so the newest lands last
+            save_cards_cache(lists, synced, started_at)
+
+def request_fetch(full=False):
+    """Ask the fetch worker to poll now; full=True bypasses the unchanged checks."""
+    global full_fetch_requested
+    if full:
+        full_fetch_requested = True
+    fetch_requested.set()
+
+def fetch_worker():
+    """Poll Trello forever, publishing snapshots when a list (or whether it
+    could be reached) changed."""
+    global full_fetch_requested
+    while True:
+        fetch_requested.clear()
+        full, full_fetch_requested = full_fetch_requested, False
+        started_at = time.time()
+        with snapshot_lock:
+            base = latest_snapshot
+        base_lists  = base['lists'] if base else {}
+        base_synced = base['synced'] if base else {}
+        t0 = time.perf_counter()
+        results = poll_cards(full)
+
+        lists, synced, errors = {}, {}, {}
+        for list_id, result in results.items():
+            if result is None and list_id not in base_lists:
+                result = RuntimeError("unchanged, but no earlier copy") # Pull it in full next time
+                full_fetch_requested = True
+                fetch_requested.set()
+            if isinstance(result, Exception):
+                print(f"Error fetching list {list_id}: {result}")
+                errors[list_id] = str(result)
+                if list_id in base_lists: # Keep showing its last good cards
+                    lists[list_id], synced[list_id] = base_lists[list_id], base_synced[list_id]
+            else:
+                lists[list_id] = base_lists[list_id] if result is None else result
+                synced[list_id] = started_at
+        record_request("fetch", time.perf_counter() - t0, not errors)
+
+        if len(errors) == len(results):
+            # Nothing reachable: keep the last good cards marked as stale, or show the errors
+            stale_since = min(synced.values()) if lists else None
+            snapshot_started = base['started_at'] if base else started_at
+        else:
+            stale_since, snapshot_started = None, started_at
+        # A requested full pull is always published: the main loop may have
+        # dropped the base as older than a write, and waits for a newer one
+        if (full or base is None or lists != base_lists or errors.keys() != base['errors'].keys()
+                or stale_since != base['stale_since']):
+            publish_snapshot(lists, synced, errors, snapshot_started, stale_since)
+        if last_webhook_at > started_at:
+            # A webhook update landed while we were pulling and we may have just
+            # overwritten it with older data: check again (cheap if unchanged).
+            fetch_requested.set()
+        # While Trello is unreachable, wait out the circuit breaker's cooldown
+        fetch_requested.wait(max(WEBHOOK_FALLBACK_SECS if webhooks_registered() else REFRESH_SECS,
+                                 trello_client.blocked_for()))
+        time.sleep(trello_client.blocked_for()) # Even when a poll is requested sooner
+
+def start_fetch_worker():
+    threading.Thread(target=fetch_worker, name="trello-fetch", daemon=True).start()
+
+# ---------- webhook receiver ----------------------------------------------
+# With WEBHOOK_PORT set, a small HTTP listener takes Trello's webhook
+# callbacks and applies each card change to the latest snapshot, so changes
+# show up within seconds and polling drops to a slow fallback. Unless the
+# callbacks' signatures can be checked (API_SECRET and WEBHOOK_CALLBACK_URL),
+# it only listens on localhost, so nothing else on the network can feed it
+# card changes.
+def webhook_signing():
+    return bool(API_SECRET and WEBHOOK_CALLBACK_URL)
+
+def webhooks_registered():
+    """Whether Trello is asked to send webhooks, so polling can slow down."""
+    return bool(WEBHOOK_PORT and WEBHOOK_CALLBACK_URL)
+
+def apply_webhook_action(cards, action, list_id):
+    """Apply one Trello webhook action to list_id's list of Cards.
+    Return the new list, the same list if the action does not affect it,
+    or None if it affects the list in a way only a fetch can resolve."""
+    kind = action.get("type")
+    data = action.get("data", {})
+    card = data.get("card") or {}
+    card_id = card.get("id")
+    if not card_id:
+        return cards
+    present = any(c.id == card_id for c in cards)
+    without = [c for c in cards if c.id != card_id]
+    action_list = (data.get("list") or {}).get("id")
+    old = data.get("old") or {}
+
+    if kind in ("deleteCard", "moveCardFromBoard"):
+        return without
+    if kind in ("createCard", "copyCard", "moveCardToBoard", "convertToCardFromCheckItem"):
+        if action_list == list_id and not present and card.get("name") is not None:
+            if kind != "createCard":
+                return None # A copied or moved card may come with labels, a due date or a cover
+            return cards + [Card(card_id, card["name"])] # New cards land at the bottom by default
+        return cards
+    if kind != "updateCard":
+        return None if present or action_list == list_id else cards
+
+    if "listAfter" in data: # Moved between lists
+        if data["listAfter"].get("id") == list_id:
+            return cards if present else None # Position in our list is unknown: fetch
+        return without
+    if "closed" in old:
+        if card.get("closed"):
+            return without
+        return None if action_list == list_id else cards # Unarchived into our list: fetch for its position
+    if not present:
+        return cards
+    if any(k in old for k in ("pos", "due", "dueComplete", "idAttachmentCover")):
+        return None # Reordered within the list, or a change to what the card shows: fetch
+    if "name" in old and "name" in card:
+        return [c.with_changes(name=card["name"]) if c.id == card_id else c for c in cards]
+    return cards
+
+def webhook_signature_ok(body, signature):
+    if not webhook_signing():
+        return True # Nothing to check against; only local callers can reach us
+    digest = hmac.new(API_SECRET.encode(), body + WEBHOOK_CALLBACK_URL.encode(), hashlib.sha1).digest()
+    return hmac.compare_digest(base64.b64encode(digest).decode(), signature or "")
+
+def ingest_webhook(payload):
+    """Feed one webhook callback body into the snapshot pipeline."""
+    global last_webhook_at
+    action = payload.get("action") or {}
+    # Callbacks arrive on threads of their own: holding the lock until the
+    # result is published keeps one callback (or a poll) from publishing in
+    # between and being overwritten
+    with snapshot_lock:
+        base = latest_snapshot
+        if base is None or base['error']:
+            fetch_requested.set() # No list yet to apply the change to
+            return
+        lists = {}
+        for list_id, cards in base['lists'].items():
+            lists[list_id] = apply_webhook_action(cards, action, list_id)
+            if lists[list_id] is None:
+                fetch_requested.set()
+                return
+        if lists != base['lists']:
+            last_webhook_at = time.time()
+            # Keep the base's start time: the main loop's stale-write check applies to it
+            publish_snapshot(lists, base['synced'], base['errors'], base['started_at'], base['stale_since'])
+
+class WebhookHandler(http.server.BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        # Trello checks the callback URL with a HEAD request when the webhook is created
+        self.send_response(200)
+        self.end_headers()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not webhook_signature_ok(body, self.headers.get("X-Trello-Webhook")):
+            self.send_response(401)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.end_headers()
+        if WEBHOOK_RECORD:
+            with open(WEBHOOK_RECORD, "ab") as f:
+                f.write(body.replace(b"\n", b" ") + b"\n")
+        try:
+            ingest_webhook(json.loads(body))
+        except (ValueError, AttributeError) as e:
+            print(f"Ignoring malformed webhook payload: {e}")
+
+    def log_message(self, format, *args):
+        pass # Keep the console quiet; Trello calls this for every card change
+
+def register_webhook():
+    """Ask Trello to call WEBHOOK_CALLBACK_URL for changes to our lists."""
+    for list_id in LIST_IDS:
+        params = {"key": API_KEY, "token": API_TOKEN, "idModel": list_id,
+                  "callbackURL": WEBHOOK_CALLBACK_URL, "description": "trello_display"}
+        try:
+            response = trello_client.post(f"{TRELLO_API}/webhooks", params=params)
+            if response.status_code != 200 and "already exists" not in response.text:
+                print(f"Webhook registration failed for {list_id}: HTTP {response.status_code} {response.text}")
+        except Exception as e:
+            print(f"Webhook registration failed for {list_id}: {e}")
+
+def start_webhook_listener():
+    host = "" if webhook_signing() else "127.0.0.1"
+    if host and WEBHOOK_CALLBACK_URL:
+        print("Webhook listener on localhost only: set API_SECRET to accept signed callbacks from the network")
+    server = http.server.ThreadingHTTPServer((host, WEBHOOK_PORT), WebhookHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="trello-webhook", daemon=True).start()
+    if WEBHOOK_CALLBACK_URL:
+        threading.Thread(target=register_webhook, name="trello-webhook-register", daemon=True).start()
+
+def take_latest_snapshot():
+    """Return the newest queued snapshot (dropping older ones), or None."""
+    snapshot = None
+    while True:
+        try:
+            snapshot = snapshot_queue.get_nowait()
+        except queue.Empty:
+            return snapshot
+
+# ---------- sync daemon ---------------------------------------------------
+# With several screens in one place, one process (trello_display.py
+# --sync-daemon) does all the Trello polling, webhooks and writes, and every
+# screen (trello_display.py with the same SYNC_SOCKET) is a render client of
+# it, so Trello sees one client however many screens there are.
+#
+# The daemon speaks JSON lines over the Unix socket SYNC_SOCKET. A client is
+# sent {"type": "snapshot", "seq", "cards", "stale_since", "error"} when it
+# connects, then {"type": "diff", "seq", "start", "end", "cards", ...} for each
+# change: replace cards[start:end] with "cards". Cards are Card.to_json()
+# lists, with the section headers already merged in, and cards whose archive
+# is pending already hidden. A client sends {"type": "write", "id",
+# "card_id", "closed"} for each archive/undo, and is sent {"type": "ack", "id"}
+# once the daemon has journalled it and told every screen.
+SYNC_SEND_TIMEOUT   = 5   # Seconds a client may stall our sends before it is dropped
+SYNC_RECONNECT_SECS = 2   # Seconds between a client's attempts to reach the daemon
+
+sync_role        = None               # 'daemon' or 'client' once started, None when syncing alone
+sync_lock        = threading.Lock()   # Daemon: guards the view and subscribers, orders broadcasts
+sync_view        = {'seq': 0, 'cards': [Card("", "Loading cards...")], 'stale_since': None, 'error': True}
+sync_snapshot    = None               # Daemon: last snapshot taken in, before hiding pending archives
+sync_writes      = {}                 # Daemon: card_id -> closed, written since sync_snapshot was fetched
+sync_subscribers = set()              # Daemon: sockets of connected clients
+sync_send_lock   = threading.Lock()   # Client: guards the two below
+sync_conn        = None               # Client: socket to the daemon while connected
+sync_unacked     = {}                 # Client: command id -> write not yet acknowledged, oldest first
+sync_command_ids = itertools.count(1)
+
+def sync_message(kind, **fields):
+    return (json.dumps({"type": kind, **fields}, separators=(",", ":")) + "\n").encode()
+
+def splice(old, new):
+    """Return (start, end, middle) such that old[start:end] = middle turns old
+    into new, keeping the unchanged head and tail of the list."""
+    start, limit = 0, min(len(old), len(new))
+    while start < limit and old[start] == new[start]:
+        start += 1
+    old_end, new_end = len(old), len(new)
+    while old_end > start and new_end > start and old[old_end - 1] == new[new_end - 1]:
+        old_end, new_end = old_end - 1, new_end - 1
+    return start, old_end, new[start:new_end]
+
+def send_to_client(conn, data):
+    """Send to one client, dropping it if it fails or stalls; False if it was
+    dropped. Caller holds sync_lock."""
+    try:
+        conn.sendall(data)
+        return True
+    except OSError:
+        sync_subscribers.discard(conn)
+        try:
+            # close() alone leaves the socket open while its handler's rfile/wfile
+            # hold it; shutting it down ends that read, and the client reconnects
+            # for a fresh snapshot
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        conn.close()
+        return False
 
-info         = pygame.display.Info()            # picks current screen size
-WIDTH        = info.current_w
-HEIGHT       = info.current_h
-screen       = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN)
-pygame.display.set_caption("Trello Today")
-pygame.mouse.set_visible(False)
+def broadcast_view(snapshot):
+    """Tell every client how snapshot's cards differ from what they show,
+    hiding the cards archived since it was fetched, landed or not.
+    Caller holds sync_lock."""
+    closed = {**sync_writes, **pending_card_states()}
+    cards = [c for c in snapshot['cards'] if not closed.get(c.id)]
+    if (cards == sync_view['cards'] and snapshot['stale_since'] == sync_view['stale_since']
+            and snapshot['error'] == sync_view['error']):
+        return
+    start, end, middle = splice(sync_view['cards'], cards)
+    sync_view.update(seq=sync_view['seq'] + 1, cards=cards, stale_since=snapshot['stale_since'],
+                     error=snapshot['error'])
+    data = sync_message("diff", seq=sync_view['seq'], start=start, end=end,
+                        cards=[c.to_json() for c in middle], stale_since=sync_view['stale_since'],
+                        error=sync_view['error'])
+    for conn in list(sync_subscribers):
+        send_to_client(conn, data)
+
+class SyncHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        conn = self.request
+        # A screen that stops reading must not hold up the others' updates
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDTIMEO, struct.pack("ll", SYNC_SEND_TIMEOUT, 0))
+        with sync_lock:
+            if send_to_client(conn, sync_message(
+                    "snapshot", seq=sync_view['seq'], cards=[c.to_json() for c in sync_view['cards']],
+                    stale_since=sync_view['stale_since'], error=sync_view['error'])):
+                sync_subscribers.add(conn)
+        try:
+            for line in self.rfile:
+                try:
+                    msg = json.loads(line)
+                    if msg["type"] != "write" or not is_real_card(msg["card_id"]):
+                        raise ValueError(f"unexpected command {msg!r}")
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"Ignoring malformed sync command: {e}")
+                    continue
+                with sync_lock:
+                    queue_card_write(msg["card_id"], bool(msg["closed"]))
+                    sync_writes[msg["card_id"]] = bool(msg["closed"])
+                    if sync_snapshot is not None: # Hide or restore the card on every screen
+                        broadcast_view(sync_snapshot)
+                    send_to_client(conn, sync_message("ack", id=msg.get("id")))
+        except OSError:
+            pass
+        finally:
+            with sync_lock:
+                sync_subscribers.discard(conn)
+
+def start_sync_server():
+    """Listen on SYNC_SOCKET, taking over a socket file left by a daemon that
+    is gone, but not one a running daemon still answers on."""
+    path = Path(SYNC_SOCKET)
+    if path.exists():
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(SYNC_SOCKET)
+            sys.exit(f"A sync daemon is already running on {SYNC_SOCKET}")
+        except OSError:
+            path.unlink()
+        finally:
+            probe.close()
+    server = socketserver.ThreadingUnixStreamServer(SYNC_SOCKET, SyncHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="trello-sync-server", daemon=True).start()
+
+def run_sync_daemon():
+    """Sync the lists for every screen on SYNC_SOCKET, without a display of our own."""
+    global sync_role, latest_snapshot, sync_snapshot
+    if not SYNC_SOCKET:
+        sys.exit("Set SYNC_SOCKET (in trello_secrets.env) to run the sync daemon")
+    sync_role = 'daemon'
+    start_outbox_worker()
+    cached = load_cards_cache()
+    if cached is not None:
+        latest_snapshot = sync_snapshot = cached
+        with sync_lock:
+            broadcast_view(cached)
+    start_sync_server()
+    start_fetch_worker()
+    if WEBHOOK_PORT:
+        start_webhook_listener()
+    if METRICS_PATH:
+        start_metrics_worker()
+    print(f"Sync daemon for {len(LIST_IDS)} list(s) listening on {SYNC_SOCKET}")
+
+    while True:
+        snapshot = snapshot_queue.get()
+        snapshot = take_latest_snapshot() or snapshot
+        with sync_lock, outbox_cond: # No write lands between the check and the swap
+            if snapshot['started_at'] < last_write_landed:
+                # Fetched before our last write landed and may not reflect it. Pull
+                # again, unless Trello is unreachable: then only pass on the badge.
+                if snapshot['stale_since'] is None:
+                    request_fetch(full=True)
+                elif sync_snapshot is not None:
+                    broadcast_view({**sync_snapshot, 'stale_since': snapshot['stale_since']})
+                continue
+            # Fetched after every landed write, so it shows them all itself
+            sync_snapshot = snapshot
+            sync_writes.clear()
+            broadcast_view(snapshot)
+
+def send_sync_command(card_id, closed):
+    """Send an archive/unarchive to the sync daemon (now, or on reconnecting)."""
+    with sync_send_lock:
+        cmd_id = next(sync_command_ids)
+        sync_unacked[cmd_id] = {'card_id': card_id, 'closed': closed}
+        if sync_conn is not None:
+            try:
+                sync_conn.sendall(sync_message("write", id=cmd_id, card_id=card_id, closed=closed))
+            except OSError:
+                pass # The client worker notices, reconnects and sends it again
+
+def publish_sync_view(cards, stale_since, error):
+    """Hand the daemon's view to the main loop, shaped like a local snapshot."""
+    snapshot_queue.put({'cards': list(cards), 'started_at': time.time(), 'stale_since': stale_since,
+                        'error': error})
+    pygame.event.post(pygame.event.Event(SNAPSHOT_READY))
+
+def sync_client_worker():
+    """Follow the sync daemon's view forever, reconnecting whenever it goes away."""
+    global sync_conn
+    cards, stale_since, error, seq = None, None, False, None
+    reported = False
+    while True:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conn.connect(SYNC_SOCKET)
+        except OSError as e:
+            conn.close()
+            if not reported:
+                print(f"Sync daemon unreachable on {SYNC_SOCKET}: {e}")
+                reported = True
+            time.sleep(SYNC_RECONNECT_SECS)
+            continue
+        reported = False
+        with sync_send_lock:
+            sync_conn = conn
+            try: # Whatever the daemon may have missed; it treats repeats as no-ops
+                for cmd_id, cmd in sync_unacked.items():
+                    conn.sendall(sync_message("write", id=cmd_id, **cmd))
+            except OSError:
+                pass
+        try:
+            for line in conn.makefile("rb"):
+                msg = json.loads(line)
+                if msg["type"] == "ack":
+                    with sync_send_lock:
+                        sync_unacked.pop(msg["id"], None)
+                    continue
+                if msg["type"] == "snapshot":
+                    cards = [Card.from_json(c) for c in msg["cards"]]
+                elif msg["type"] == "diff" and cards is not None and msg["seq"] == seq + 1:
+                    cards[msg["start"]:msg["end"]] = [Card.from_json(c) for c in msg["cards"]]
+                else:
+                    raise ValueError(f"unexpected {msg['type']} {msg.get('seq')} after {seq}")
+                seq, stale_since, error = msg["seq"], msg["stale_since"], msg["error"]
+                publish_sync_view(cards, stale_since, error)
+                last_message_at = time.time()
+            print("Sync daemon closed the connection")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Lost the sync daemon: {e}")
+        finally:
+            with sync_send_lock:
+                sync_conn = None
+            conn.close()
+        if cards is not None and stale_since is None:
+            # Keep the last cards up, marked as synced when we last heard from the daemon
+            stale_since = last_message_at
+            publish_sync_view(cards, stale_since, error)
+        time.sleep(SYNC_RECONNECT_SECS)
+
+def start_sync_client():
+    global sync_role
+    sync_role = 'client'
+    threading.Thread(target=sync_client_worker, name="trello-sync-client", daemon=True).start()
 
-# Attempt to load specified fonts, falling back to system default
+# ---------- Pygame initialisation ----------------------------------------
+# Nothing touches the display at import time, so the drawing code can be
+# imported (tools/bench.py). init_display() opens the screen and loads fonts.
 FONT_SIZE = 26
 FONT_CANDIDATES = ["Roboto Regular", "Roboto", "sans-serif", None]
-# Define a dictionary for fonts
-fonts = {}
-for name in FONT_CANDIDATES:
+# Fonts (names or file paths) tried in order for characters the main font lacks: CJK, symbols, emoji
+FALLBACK_FONT_CANDIDATES = ["Noto Sans CJK JP", "Noto Sans Symbols2", "Noto Emoji", "Noto Color Emoji", "DejaVu Sans"]
+FONT_CACHE_PATH = Path(__file__).with_name("font_cache.json")  # Delete after installing new fonts
+
+WIDTH = HEIGHT = 0   # Screen size, set by init_display()
+screen    = None
+font_path = None
+fallback_font_paths = []
+fonts     = {}       # 'default', 'modal_header', 'modal_button', 'status'
+font_sizes = {}      # Font -> point size it was loaded at, for its fallbacks
+
+def match_font_file(name):
+    if os.path.isabs(name):
+        return name if os.path.exists(name) else None
+    return pygame.font.match_font(name)
+
+def resolve_font_paths():
+    """Return (file of the first installed FONT_CANDIDATES font, or None for
+    pygame's built-in default; files of the installed fallback fonts). The
+    fc-list scan behind match_font() can take seconds on a Pi, so the
+    answer is cached on disk."""
+    try:
+        with open(FONT_CACHE_PATH) as f:
+            cached = json.load(f)
+        if (cached["candidates"] == FONT_CANDIDATES and cached["fallback_candidates"] == FALLBACK_FONT_CANDIDATES
+                and all(p is None or os.path.exists(p) for p in [cached["path"]] + cached["fallbacks"])):
+            return cached["path"], cached["fallbacks"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    path = None
+    for name in FONT_CANDIDATES:
+        if name is None:
+            break
+        path = match_font_file(name)
+        if path:
+            break
+    fallbacks = []
+    for name in FALLBACK_FONT_CANDIDATES:
+        p = match_font_file(name)
+        if p and p != path and p not in fallbacks:
+            fallbacks.append(p)
+    try:
+        write_json_atomic(FONT_CACHE_PATH, {"candidates": FONT_CANDIDATES, "path": path,
+                                            "fallback_candidates": FALLBACK_FONT_CANDIDATES,
+                                            "fallbacks": fallbacks})
+    except OSError as e:
+        print(f"Error saving font cache: {e}")
+    return path, fallbacks
+
+def load_font(size):
+    font = _load_font(size)
+    font_sizes[font] = size
+    return font
+
+def _load_font(size):
     try:
-        fonts['default'] = pygame.font.SysFont(name, FONT_SIZE)
-        # print(f"Successfully loaded font: {name if name else 'System Default'} with size {FONT_SIZE}") # Optional: for debugging
-        break  # Exit loop if font is successfully loaded
+        return pygame.font.Font(font_path, size)
+    except (pygame.error, OSError) as e:
+        print(f"Error loading font {font_path}: {e}. Using default.")
+    try:
+        return pygame.font.Font(None, size)
     except pygame.error:
-        # print(f"Font '{name}' not found or failed to load, trying next...") # Optional: for debugging
-        if name == FONT_CANDIDATES[-1] and 'default' not in fonts:  # Check if it's the last candidate and font is still None
-            print(f"CRITICAL: Default font (None) also failed to load with size {FONT_SIZE}. Exiting.")
-            pygame.quit()
-            sys.exit() # Exit if all fonts fail
-
-if 'default' not in fonts: # This case should ideally be handled by the sys.exit() in the loop
-    print(f"CRITICAL: No suitable font could be loaded after trying all candidates: {FONT_CANDIDATES}. Exiting.")
-    pygame.quit()
-    sys.exit()
-
-# Load other font sizes as needed by the new modal
-try:
-    fonts['modal_header'] = pygame.font.SysFont(FONT_CANDIDATES[0] if FONT_CANDIDATES[0] else "sans-serif", 28) # For "ITEM ARCHIVED"
-    fonts['modal_button'] = pygame.font.SysFont(FONT_CANDIDATES[0] if FONT_CANDIDATES[0] else "sans-serif", 24) # For Undo/Dismiss buttons
-except pygame.error as e:
-    print(f"Error loading additional fonts: {e}. Using default.")
-    if 'modal_header' not in fonts: fonts['modal_header'] = fonts['default']
-    if 'modal_button' not in fonts: fonts['modal_button'] = fonts['default']
-
-
-font = fonts['default'] # Keep 'font' for existing code compatibility
+        print(f"CRITICAL: Default font (None) also failed to load with size {size}. Exiting.")
+        pygame.quit()
+        sys.exit() # Exit if all fonts fail
+
+def init_display(size=None):
+    """Open the screen and load the fonts. With size=None the display runs full
+    screen at the screen's own resolution; a (width, height) size opens a
+    plain window of that size instead, e.g. for benchmarks."""
+    global WIDTH, HEIGHT, screen, font_path, fallback_font_paths, font, card_atlas, modal_background_surface
+    # Only the subsystems the display uses; pygame.init() would also bring up
+    # audio and joysticks, which cost boot time on a Pi.
+    pygame.display.init()
+    pygame.font.init()
+
+    if size is None:
+        info   = pygame.display.Info()            # picks current screen size
+        WIDTH  = info.current_w
+        HEIGHT = info.current_h
+        screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN)
+    else:
+        WIDTH, HEIGHT = size
+        screen = pygame.display.set_mode(size)
+    pygame.display.set_caption("Trello Today")
+    pygame.mouse.set_visible(False)
+    # Two card widths by two screen heights; the cards rendered for another size are useless now
+    layout_cache.clear()
+    card_atlas = CardAtlas((card_container_width() * 2, HEIGHT * ATLAS_SCREENS // 2))
+    modal_background_surface = pygame.Surface((WIDTH, HEIGHT)).convert() # Reused by every tap
+    mark_boot("display init")
+
+    if not fonts: # Fonts survive a change of screen size
+        font_path, fallback_font_paths = resolve_font_paths()
+        fonts.update({
+            'default':      load_font(FONT_SIZE),
+            'modal_header': load_font(28), # For "ITEM ARCHIVED"
+            'modal_button': load_font(24), # For Undo/Dismiss buttons
+            'status':       load_font(18), # For the "stale since" badge
+        })
+        font = fonts['default'] # Keep 'font' for existing code compatibility
+        mark_boot("font load")
 
 REFRESH_SECS = 120                              # Trello re-pull every 2 min
 LINE_SPACING_MULTIPLIER = 1.2                 # Adjust for more/less space between wrapped lines
 CARD_VERTICAL_PADDING_EACH_SIDE = 19          # Pixels of padding above and below text in a card
+SECTION_VERTICAL_PADDING = 6                  # ...and around a list's section header
+
+# ---------- text shaping --------------------------------------------------
+# Text is measured from per-character advances, looked up once per (font,
+# character) in an LRU cache, so wrapping sums numbers instead of asking
+# SDL_ttf to measure every word. A character the font has no glyph for is
+# taken from the first fallback font that has one; lines mixing fonts are
+# rendered run by run.
+GLYPH_CACHE_SIZE = 8192   # (font, character) entries
+WORD_CACHE_SIZE  = 16384  # (font, word) entries; card titles repeat words a lot
+
+fallback_chains = {}  # Font -> [Font] at the same size, loaded on first need
+notdef_metrics  = {}  # Font -> metrics SDL_ttf reports for a missing glyph
+
+def fallback_chain(font):
+    chain = fallback_chains.get(font)
+    if chain is None:
+        chain = []
+        for path in fallback_font_paths:
+            try:
+                chain.append(pygame.font.Font(path, font_sizes.get(font, FONT_SIZE)))
+            except (pygame.error, OSError) as e:
+                print(f"Skipping fallback font {path}: {e}")
+        fallback_chains[font] = chain
+    return chain
+
+def glyph_metrics(font, ch):
+    """Return ch's metrics in font, or None if the font has no glyph for it."""
+    try:
+        m = font.metrics(ch)[0]
+        if font not in notdef_metrics: # U+FFFF is a noncharacter: no font has it
+            notdef_metrics[font] = font.metrics("\uffff")[0]
+    except (pygame.error, UnicodeError):
+        return None
+    return m if m != notdef_metrics[font] else None
+
+@functools.lru_cache(maxsize=GLYPH_CACHE_SIZE)
+def glyph(font, ch):
+    """Return (font to draw ch with, ch's advance in pixels)."""
+    for f in [font] + fallback_chain(font):
+        m = glyph_metrics(f, ch)
+        if m:
+            return f, m[4]
+    try: # Missing everywhere: the main font draws its "missing" box
+        return font, font.size(ch)[0]
+    except (pygame.error, UnicodeError):
+        return font, 0
+
+def text_width(text, font):
+    """Width of text from cached advances. This ignores kerning, so wrap_text()
+    settles each line break with exact_width()."""
+    return sum(glyph(font, ch)[1] for ch in text)
+
+@functools.lru_cache(maxsize=WORD_CACHE_SIZE)
+def word_metrics(font, word):
+    """Return (exact_width(word), whether any of its characters come from a fallback font).
+    Cached per word, so a line's estimate only drifts by the kerning around its spaces."""
+    fallback = any(glyph(font, ch)[0] is not font for ch in word)
+    return exact_width(word, font, not fallback), fallback
+
+def text_runs(text, font):
+    """Split text into [(font, substring)] runs drawn with one font each."""
+    runs = []
+    for ch in text:
+        f = glyph(font, ch)[0]
+        if runs and runs[-1][0] is f:
+            runs[-1][1].append(ch)
+        else:
+            runs.append((f, [ch]))
+    return [(f, "".join(chars)) for f, chars in runs]
+
+def exact_width(text, font, plain=False):
+    """Rendered width of text; plain=True if it is known to need no fallback font."""
+    if plain:
+        return font.size(text)[0]
+    return sum(f.size(run)[0] for f, run in text_runs(text, font))
+
+def render_text(text, font, color):
+    """font.render(), taking missing glyphs from the fallback fonts."""
+    runs = text_runs(text, font)
+    if len(runs) <= 1:
+        return font.render(text, True, color)
+    surfaces = [(f, f.render(run, True, color)) for f, run in runs]
+    baseline = max(f.get_ascent() for f, _ in surfaces)
+    height = max(baseline - f.get_ascent() + s.get_height() for f, s in surfaces)
+    line = pygame.Surface((sum(s.get_width() for _, s in surfaces), height), pygame.SRCALPHA)
+    x = 0
+    for f, s in surfaces:
+        line.blit(s, (x, baseline - f.get_ascent())) # Runs share the main font's baseline
+        x += s.get_width()
+    return line
+
+def break_token(token, font, max_width):
+    """Split a token wider than max_width (a URL, say) into pieces that fit."""
+    pieces = []
+    while token:
+        edges = list(itertools.accumulate(glyph(font, ch)[1] for ch in token))
+        n = max(1, bisect.bisect_right(edges, max_width)) # At least one character per line
+        while n > 1 and exact_width(token[:n], font) > max_width:
+            n -= 1                                         # Kerning pushed it over the edge
+        pieces.append(token[:n])
+        token = token[n:]
+    return pieces
 
 # ---------- word-wrap helper ---------------------------------------------
 def wrap_text(text, font, max_width):
     """Return list of text lines that fit within max_width pixels."""
-    words, lines, current = text.split(), [], ""
-    for w in words:
-        test = (current + " " + w).strip()
-        if font.size(test)[0] <= max_width:
-            current = test
+    space_w = glyph(font, " ")[1]
+    pieces, widths, mixed = [], [], []
+    for word in text.split():
+        w, fallback = word_metrics(font, word)
+        if w > max_width:
+            for piece in break_token(word, font, max_width):
+                pieces.append(piece)
+                widths.append(exact_width(piece, font, not fallback)) # Advances undercount a long piece
+                mixed.append(fallback)
         else:
-            lines.append(current)
-            current = w
-    lines.append(current)
+            pieces.append(word)
+            widths.append(w)
+            mixed.append(fallback)
+    if not pieces:
+        return [""]
+
+    # starts[i] = where piece i would start if pieces[:i] were on one line;
+    # the last piece that fits on a line starting at piece a is found by
+    # binary search, so each line costs O(log n).
+    starts = list(itertools.accumulate((w + space_w for w in widths), initial=0))
+    slack  = font.get_height() // 2 # Most kerning and overhang a line can plausibly have
+    lines, a = [], 0
+    while a < len(pieces):
+        b = max(a + 1, bisect.bisect_right(starts, starts[a] + max_width + space_w) - 1)
+        line = " ".join(pieces[a:b])
+        # Advances ignore kerning and overhang, so a break that is close
+        # either way, or a line that mixes in fallback fonts, is settled
+        # with the real width
+        while (b - a > 1 and (starts[b] - space_w - starts[a] > max_width - slack or any(mixed[a:b]))
+               and exact_width(line, font, not any(mixed[a:b])) > max_width):
+            b -= 1
+            line = " ".join(pieces[a:b])
+        while (b < len(pieces) and starts[b + 1] - space_w - starts[a] <= max_width + slack
+               and exact_width(line + " " + pieces[b], font, not any(mixed[a:b + 1])) <= max_width):
+            line += " " + pieces[b]
+            b += 1
+        lines.append(line)
+        a = b
     return lines
 
+# ---------- cover thumbnails ----------------------------------------------
+# Cover images are downloaded, decoded and scaled by a background thread;
+# rendering never waits for one. A card is drawn with a placeholder until its
+# thumbnail is ready and is re-rendered when it arrives. Downloads are kept
+# in thumb_cache/ (least recently used files removed beyond THUMB_DISK_BYTES)
+# and scaled thumbnails in memory (beyond THUMB_MEMORY_BYTES), so scrolling
+# back or rebooting does not download them again.
+THUMB_CACHE_DIR    = Path(__file__).with_name("thumb_cache")
+THUMB_DISK_BYTES   = 16 * 1024 * 1024
+THUMB_MEMORY_BYTES = 4 * 1024 * 1024
+THUMB_READY        = pygame.USEREVENT + 2    # Posted to wake an idle main loop
+THUMB_RETRY_SECS   = 30                      # Wait before retrying a cover that failed to download...
+THUMB_MAX_RETRY_SECS = 600                   # ...doubling on each failure up to this
+
+thumb_requests = queue.Queue()   # (url, size) for the worker to load
+thumb_results  = queue.Queue()   # (url, size, Surface or None) for the main loop
+thumb_pending  = set()           # (url, size) requested and not taken in yet (main thread only)
+thumb_failed   = set()           # (url, size) that can never load (4xx, undecodable); not retried until restart
+thumb_backoff  = {}              # (url, size) -> seconds before its next try (worker thread only)
+thumb_memory   = collections.OrderedDict()  # (url, size) -> Surface, least recently used first
+thumb_memory_bytes = 0
+
+def thumb_file(url):
+    return THUMB_CACHE_DIR / hashlib.sha1(url.encode()).hexdigest()
+
+def trim_thumb_disk_cache():
+    """Remove the least recently used downloads beyond THUMB_DISK_BYTES."""
+    files = []
+    for path in THUMB_CACHE_DIR.iterdir():
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        files.append((st.st_mtime, st.st_size, path))
+    total = 0
+    for _, size, path in sorted(files, reverse=True):
+        total += size
+        if total > THUMB_DISK_BYTES:
+            path.unlink(missing_ok=True)
+
+def download_thumbnail(url):
+    """Return the file holding url's image, downloading it on a disk cache miss."""
+    path = thumb_file(url)
+    if path.exists():
+        os.utime(path) # Mark it recently used
+        return path
+    if urllib.parse.urlsplit(url).hostname in ("trello.com", "api.trello.com"):
+        # Files uploaded to Trello are only served with the API credentials, and
+        # count against the same rate limit as the card pulls
+        headers = {"Authorization": f'OAuth oauth_consumer_key="{API_KEY}", oauth_token="{API_TOKEN}"'}
+        response = trello_client.get(url, headers=headers, timeout=20)
+    else:
+        response = session.get(url, timeout=20)
+    response.raise_for_status()
+    THUMB_CACHE_DIR.mkdir(exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(response.content)
+    os.replace(tmp, path)
+    trim_thumb_disk_cache()
+    return path
+
+def scale_thumbnail(path, size):
+    """Decode an image and scale it to fill size, cropping what overflows."""
+    image = pygame.image.load(str(path))
+    w, h = image.get_size()
+    scale = max(size[0] / w, size[1] / h)
+    scaled_size = (max(size[0], round(w * scale)), max(size[1], round(h * scale)))
+    # smoothscale only takes 24/32-bit images; palette images (GIFs) are scaled plainly
+    scaler = pygame.transform.smoothscale if image.get_bitsize() >= 24 else pygame.transform.scale
+    scaled = scaler(image, scaled_size)
+    crop = pygame.Rect((0, 0), size)
+    crop.center = scaled.get_rect().center
+    return scaled.subsurface(crop).copy()
+
+def thumb_error_is_permanent(e):
+    """True if retrying can't help: a 4xx answer, or an image that doesn't decode."""
+    if isinstance(e, requests.HTTPError):
+        status = e.response.status_code if e.response is not None else None
+        return status is not None and 400 <= status < 500 and status not in (408, 429)
+    return not isinstance(e, OSError) # Network (CircuitOpenError too) and disk errors pass
+
+def thumbnail_worker():
+    retries = [] # (due, url, size), soonest first; they stay in thumb_pending meanwhile
+    while True:
+        try:
+            timeout = max(0, retries[0][0] - time.monotonic()) if retries else None
+            url, size = thumb_requests.get(timeout=timeout)
+        except queue.Empty:
+            _, url, size = heapq.heappop(retries)
+        key = (url, size)
+        try:
+            surface = scale_thumbnail(download_thumbnail(url), size)
+        except Exception as e: # Keep the placeholder, for good or until a retry works
+            if not thumb_error_is_permanent(e):
+                delay = min(thumb_backoff.get(key, THUMB_RETRY_SECS / 2) * 2, THUMB_MAX_RETRY_SECS)
+                thumb_backoff[key] = delay
+                heapq.heappush(retries, (time.monotonic() + delay, url, size))
+                print(f"Error loading thumbnail {url}: {e}; retrying in {delay:.0f}s")
+                continue
+            print(f"Error loading thumbnail {url}: {e}")
+            surface = None
+        thumb_backoff.pop(key, None)
+        thumb_results.put((url, size, surface))
+        pygame.event.post(pygame.event.Event(THUMB_READY))
+
+def start_thumbnail_worker():
+    threading.Thread(target=thumbnail_worker, name="thumbnails", daemon=True).start()
+
+def get_thumbnail(url, size):
+    """Return url's image scaled to size if it is ready, else None, asking
+    the worker for it. Never blocks."""
+    key = (url, size)
+    surface = thumb_memory.get(key)
+    if surface is not None:
+        thumb_memory.move_to_end(key)
+        return surface
+    if key not in thumb_pending and key not in thumb_failed:
+        thumb_pending.add(key)
+        thumb_requests.put(key)
+    return None
+
+def take_thumbnails():
+    """Take in the thumbnails the worker finished; return the URLs now ready."""
+    global thumb_memory_bytes
+    ready = set()
+    while True:
+        try:
+            url, size, surface = thumb_results.get_nowait()
+        except queue.Empty:
+            return ready
+        thumb_pending.discard((url, size))
+        if surface is None:
+            thumb_failed.add((url, size))
+            continue
+        surface = surface.convert() # Display format, for fast blits
+        thumb_memory[(url, size)] = surface
+        thumb_memory_bytes += surface.get_width() * surface.get_height() * surface.get_bytesize()
+        while thumb_memory_bytes > THUMB_MEMORY_BYTES and len(thumb_memory) > 1:
+            _, old = thumb_memory.popitem(last=False)
+            thumb_memory_bytes -= old.get_width() * old.get_height() * old.get_bytesize()
+        ready.add(url)
+
+# ---------- card atlas ----------------------------------------------------
+# Rendered cards are packed into one large surface instead of a surface each.
+# The list, the modal animation and an undone card's return to the list all
+# blit the same pixels, through a subsurface (a view, not a copy). When the
+# atlas is full, the cards drawn least recently (those scrolled off screen)
+# give up their space and are rendered again if they come back, so memory
+# stays the same however long the list. Cards are packed on shelves: rows
+# as tall as the first card placed on them, filled left to right.
+ATLAS_SCREENS = 4     # Atlas area, in screenfuls of cards
+SHELF_SLACK   = 1.25  # A card may use a shelf up to this much taller than itself...
+                      # ...before a shelf of its own height is opened instead
+
+class CardAtlas:
+    def __init__(self, size):
+        self.surface = pygame.Surface(size).convert()
+        self.shelves = []  # [{'y', 'h', 'slots': [[x, w, entry or None]]}], top to bottom
+        self.lru     = collections.OrderedDict()  # id(entry) -> entry, least recently drawn first
+        self.pinned  = set()  # id()s of entries that must keep their pixels (the modal's card)
+
+    def take(self, entry):
+        """Return a surface for a layout entry to be rendered into: a slot of
+        the atlas, or a surface of its own if the entry cannot fit."""
+        w, h = entry['width'], entry['rect_h']
+        place = self._place(w, h)
+        while place is None and self._evict_one():
+            place = self._place(w, h)
+        if place is None:
+            return pygame.Surface((w, h)).convert() # Taller than the room left around pinned cards
+        shelf, slot = place
+        slot[2] = entry
+        entry['atlas_slot'] = (shelf, slot)
+        self.lru[id(entry)] = entry
+        return self.surface.subsurface((slot[0], shelf['y'], w, h))
+
+    def touch(self, entry):
+        if id(entry) in self.lru:
+            self.lru.move_to_end(id(entry))
+
+    def release(self, entry):
+        """Give an entry's slot back; it is rendered again on its next use."""
+        entry['surface'], entry['drawn'] = None, False
+        if entry.get('atlas_slot') is None:
+            return
+        shelf, slot = entry['atlas_slot']
+        entry['atlas_slot'] = None
+        slot[2] = None
+        self.lru.pop(id(entry), None)
+        if all(s[2] is None for s in shelf['slots']) and shelf in self.shelves:
+            self.shelves.remove(shelf) # Its rows are free for shelves of any height
+
+    def pin(self, entry):
+        self.pinned.add(id(entry))
+
+    def unpin(self, entry):
+        self.pinned.discard(id(entry))
+
+    def clear(self):
+        for entry in list(self.lru.values()):
+            self.release(entry)
+        self.pinned.clear()
+
+    def _place(self, w, h):
+        """Find room for a w×h card: the lowest fitting shelf, or a new shelf,
+        or failing that any shelf tall enough. Return (shelf, slot) or None."""
+        width, height = self.surface.get_size()
+        best = None
+        for shelf in self.shelves:
+            if shelf['h'] >= h and (best is None or shelf['h'] < best[0]['h']):
+                slot = next((s for s in shelf['slots'] if s[2] is None and s[1] >= w), None)
+                if slot is None:
+                    end = shelf['slots'][-1][0] + shelf['slots'][-1][1] if shelf['slots'] else 0
+                    if end + w <= width:
+                        slot = [end, w, None]
+                        shelf['slots'].append(slot)
+                if slot is not None:
+                    best = (shelf, slot)
+        if best is not None and best[0]['h'] <= h * SHELF_SLACK:
+            return best
+        y = 0 # Open a shelf in the first gap between shelves that is tall enough
+        for i, shelf in enumerate(self.shelves + [{'y': height, 'h': 0}]):
+            if shelf['y'] - y >= h and w <= width:
+                new = {'y': y, 'h': h, 'slots': [[0, w, None]]}
+                self.shelves.insert(i, new)
+                return new, new['slots'][0]
+            y = shelf['y'] + shelf['h']
+        return best
+
+    def _evict_one(self):
+        """Release the least recently drawn entry that is not pinned."""
+        for key, entry in self.lru.items():
+            if key not in self.pinned:
+                self.release(entry)
+                return True
+        return False
+
+card_atlas = None  # Set by init_display(), sized for the screen
+
+# ---------- card layout cache ---------------------------------------------
+# Wrapping a card only happens when its text, the card width or the font
+# changes, and its surface is rendered the first time it scrolls into view;
+# a frame of the list is otherwise just one blit per visible card.
+layout_cache = {}  # (card, inner_w, font) -> {'lines', 'rect_h', 'surface', ...}
+LABEL_SIZE = (32, 8)  # Label colour pills above the card text
+LABEL_GAP  = 6        # Pixels between pills, and below the row of them
+THUMB_GAP  = 12       # Pixels between the text and the cover thumbnail
+
+def card_container_width():
+    return int(WIDTH * 0.90)                     # Cards occupy 90% of screen width
+
+def layout_card(card, container_w):
+    """Return the cached layout for a Card, wrapping it on a miss."""
+    header  = is_section_header(card.id)
+    font    = fonts['modal_button'] if header else fonts['default']
+    padding = SECTION_VERTICAL_PADDING if header else CARD_VERTICAL_PADDING_EACH_SIDE
+    inner_w = container_w - 40                   # Text area width inside a card (20px padding L/R)
+    key     = (card, inner_w, font)
+    entry   = layout_cache.get(key)
+    if entry is not None:
+        return entry
+
+    line_h = font.get_height()
+    # A cover thumbnail, two lines tall, sits to the right of the text
+    thumb_size = (line_h * 8 // 3, line_h * 2) if card.cover else None
+    text_w = inner_w - thumb_size[0] - THUMB_GAP if thumb_size else inner_w
+    lines  = wrap_text(card.name, font, text_w)
+
+    # Calculate the height of the text block within the card
+    if not lines: # Handle cases with empty card text
+        text_block_height = 0
+    elif len(lines) == 1:
+        text_block_height = line_h
+    else:
+        # Height of all text lines + height of (n-1) inter-line spaces
+        text_block_height = (line_h * len(lines)) + \
+                            (line_h * (LINE_SPACING_MULTIPLIER - 1) * (len(lines) - 1))
+
+    labels_h = LABEL_SIZE[1] + LABEL_GAP if card.labels else 0
+    due_text = format_due(card.due) if card.due else None
+    due_h    = fonts['status'].get_height() + 4 if due_text else 0
+    content_h = max(labels_h + text_block_height + due_h, thumb_size[1] if thumb_size else 0)
+
+    # Total height of the card rectangle, including vertical padding
+    rect_h = int(content_h + (padding * 2))
+
+    entry = {'lines': lines, 'rect_h': rect_h, 'surface': None, 'atlas_slot': None, 'drawn': False,
+             'font': font, 'width': container_w, 'header': header, 'padding': padding,
+             'labels': card.labels, 'due_text': due_text,
+             'cover': card.cover, 'thumb_size': thumb_size, 'thumb_drawn': False}
+    layout_cache[key] = entry
+    return entry
+
+def card_surface(entry):
+    """Return the card's pre-rendered surface (in the atlas), rendering it on
+    first use, after eviction, or when refresh_thumbnails() asks."""
+    if entry['surface'] is None:
+        entry['surface'] = card_atlas.take(entry)
+        entry['drawn'] = False
+    else:
+        card_atlas.touch(entry)
+    if not entry['drawn']:
+        surface, font, line_h = entry['surface'], entry['font'], entry['font'].get_height()
+        # Black corners match the list background
+        surface.fill((0, 0, 0))
+        if not entry['header']: # Section headers are bare grey text
+            pygame.draw.rect(surface, (22, 26, 30), surface.get_rect(), border_radius=10) # Dark card background
+        color = (150, 150, 150) if entry['header'] else (255, 255, 255) # White text
+        current_text_y = entry['padding'] # Y position for the first line of text
+        for i, label in enumerate(entry['labels']):
+            pill = pygame.Rect((20 + i * (LABEL_SIZE[0] + LABEL_GAP), current_text_y), LABEL_SIZE)
+            if pill.right > entry['width'] - 20:
+                break # More labels than fit on one row
+            pygame.draw.rect(surface, label_color(label), pill, border_radius=4)
+        if entry['labels']:
+            current_text_y += LABEL_SIZE[1] + LABEL_GAP
+        for ln_text in entry['lines']:
+            text_surface = render_text(ln_text, font, color)
+            surface.blit(text_surface, (20, current_text_y)) # 20px left padding for text
+            current_text_y += line_h * LINE_SPACING_MULTIPLIER # Move to next line position
+        if entry['due_text']:
+            due_y = current_text_y - line_h * (LINE_SPACING_MULTIPLIER - 1) + 4
+            surface.blit(render_text(entry['due_text'], fonts['status'], (170, 170, 170)), (20, due_y))
+        if entry['thumb_size']:
+            thumb_rect = pygame.Rect((0, entry['padding']), entry['thumb_size'])
+            thumb_rect.right = entry['width'] - 20
+            thumb = get_thumbnail(entry['cover'], entry['thumb_size'])
+            if thumb is not None:
+                surface.blit(thumb, thumb_rect)
+            else: # Redrawn with the image once it is ready (refresh_thumbnails)
+                pygame.draw.rect(surface, (40, 46, 54), thumb_rect, border_radius=6)
+            entry['thumb_drawn'] = thumb is not None
+        entry['drawn'] = True
+    return entry['surface']
+
+def evict_layouts(cards):
+    """Forget the cached layouts (for the current width/font) of Cards."""
+    inner_w = card_container_width() - 40
+    for card in cards:
+        font = fonts['modal_button'] if is_section_header(card.id) else fonts['default']
+        entry = layout_cache.pop((card, inner_w, font), None)
+        if entry is not None:
+            card_atlas.release(entry)
+
+# ---------- snapshot diffing ----------------------------------------------
+# A refresh is compared with the list on screen, keyed by card id plus a hash
+# of what the card shows, so only cards that were inserted, deleted, moved or edited
+# touch the layout cache, the list index and the screen.
+def _stable_positions(old_positions):
+    """Return the set of indices into old_positions forming a longest increasing
+    subsequence: the cards that can stay put while the others move."""
+    tails, tails_at, prev = [], [], [None] * len(old_positions)
+    for i, p in enumerate(old_positions):
+        k = bisect.bisect_left(tails, p)
+        prev[i] = tails_at[k - 1] if k else None
+        if k == len(tails):
+            tails.append(p); tails_at.append(i)
+        else:
+            tails[k], tails_at[k] = p, i
+    stable, i = set(), tails_at[-1] if tails_at else None
+    while i is not None:
+        stable.add(i)
+        i = prev[i]
+    return stable
+
+def diff_cards(old, new):
+    """Diff two lists of Cards. Return a dict of card ids per change
+    ('inserts', 'deletes', 'moves', 'edits') and 'first_changed', the first
+    position in `new` that differs from `old` (len(new) if none, or None if
+    the lists are identical)."""
+    old_keys = {c.id: hash(c) for c in old}
+    new_keys = {c.id: hash(c) for c in new}
+    inserts = [c.id for c in new if c.id not in old_keys]
+    deletes = [c.id for c in old if c.id not in new_keys]
+    edits   = [c.id for c in new if c.id in old_keys and old_keys[c.id] != new_keys[c.id]]
+
+    old_pos = {c.id: i for i, c in enumerate(old)}
+    common  = [c.id for c in new if c.id in old_pos]
+    stable  = _stable_positions([old_pos[card_id] for card_id in common])
+    moves   = [card_id for i, card_id in enumerate(common) if i not in stable]
+
+    first_changed = next((i for i, (a, b) in enumerate(zip(old, new)) if a != b), None)
+    if first_changed is None and len(old) != len(new):
+        first_changed = min(len(old), len(new))
+    return {'inserts': inserts, 'deletes': deletes, 'moves': moves, 'edits': edits,
+            'first_changed': first_changed}
+
+# ---------- virtualized list index ----------------------------------------
+# Card tops are kept as a prefix sum over card heights, so the cards inside
+# the visible window (and the card under a tap) are found by binary search
+# instead of walking the whole list. After `tasks` changes the index is
+# rebuilt only from the first changed position (invalidate_list_index), and
+# in full when a different card is excluded.
+LIST_TOP_MARGIN = 15                             # Y position of the first card
+CARD_SPACING    = 12                             # Vertical space between cards
+
+list_index = None  # {'key', 'items': [(task_index, card, layout)], 'tops', 'total_h'}
+list_index_stale_from = None  # First task index whose item may be out of date
+scroll_y   = 0.0   # Pixels of the list scrolled off the top of the screen
+
+def invalidate_list_index(start=0):
+    """Call after `tasks` changes at positions >= start (snapshot swap, pop, insert)."""
+    global list_index_stale_from
+    list_index_stale_from = start if list_index_stale_from is None else min(list_index_stale_from, start)
+
+def get_list_index(tasks, exclude_id=None):
+    global list_index, list_index_stale_from
+    container_w = card_container_width()
+    key = (exclude_id, container_w, fonts['default'])
+    if list_index is not None and list_index['key'] == key and list_index_stale_from is None:
+        return list_index
+
+    start = 0
+    if list_index is not None and list_index['key'] == key and exclude_id is None:
+        # Without an excluded card, item i is tasks[i]; keep the unchanged prefix
+        start = min(list_index_stale_from, len(list_index['items']))
+    if start:
+        items, tops = list_index['items'][:start], list_index['tops'][:start]
+        y = tops[-1] + items[-1][2]['rect_h'] + CARD_SPACING
+    else:
+        items, tops, y = [], [], LIST_TOP_MARGIN
+    for i in range(start, len(tasks)):
+        card = tasks[i]
+        if exclude_id and card.id == exclude_id:
+            continue
+        layout = layout_card(card, container_w)
+        items.append((i, card, layout))
+        tops.append(y)
+        y += layout['rect_h'] + CARD_SPACING
+    list_index = {'key': key, 'items': items, 'tops': tops, 'total_h': y}
+    list_index_stale_from = None
+    return list_index
+
+def item_screen_top(index, i):
+    """Screen y of item i, or of where it would start if i is past the end."""
+    y = index['tops'][i] if i < len(index['tops']) else index['total_h']
+    return y - int(scroll_y)
+
+def max_scroll(index):
+    return max(0, index['total_h'] - HEIGHT)
+
+def visible_range(index):
+    """Return (first, stop) indices of the items overlapping the screen."""
+    tops = index['tops']
+    first = max(0, bisect.bisect_right(tops, scroll_y) - 1)
+    stop = bisect.bisect_left(tops, scroll_y + HEIGHT)
+    return first, stop
+
+def hit_test_list(tasks, pos):
+    """Return (screen_rect, card, task_index) for the card at pos, or None."""
+    index = get_list_index(tasks)
+    tops, y = index['tops'], pos[1] + scroll_y
+    i = bisect.bisect_right(tops, y) - 1
+    if i < 0:
+        return None
+    task_index, card, layout = index['items'][i]
+    container_w = card_container_width()
+    rect = pygame.Rect((WIDTH - container_w) // 2, tops[i] - int(scroll_y), container_w, layout['rect_h'])
+    if not rect.collidepoint(pos):
+        return None # In the gap between cards or the side margins
+    return rect, card, task_index
+
+def refresh_thumbnails(urls):
+    """Mark cards drawn with a placeholder for one of urls to be re-rendered
+    with the image, in place. Return the screen rects of those in view."""
+    stale = [e for e in layout_cache.values()
+             if e['cover'] in urls and e['drawn'] and not e['thumb_drawn']]
+    for entry in stale:
+        entry['drawn'] = False
+    if list_index is None or not stale:
+        return []
+    stale_ids   = {id(e) for e in stale}
+    container_w = card_container_width()
+    rects = []
+    first, stop = visible_range(list_index)
+    for i in range(first, stop):
+        layout = list_index['items'][i][2]
+        if id(layout) in stale_ids:
+            rects.append(pygame.Rect((WIDTH - container_w) // 2, item_screen_top(list_index, i),
+                                     container_w, layout['rect_h']))
+    return rects
+
 # ---------- drawing -------------------------------------------------------
-def draw_list_view(tasks, animating_card_id_to_exclude=None):
-    # This function draws the list of Trello cards.
+def draw_list_view(tasks, animating_card_id_to_exclude=None, target=None):
+    # This function draws the visible part of the list of Trello cards.
     # It excludes a specific card if its ID is provided in animating_card_id_to_exclude,
     # which is used when a card is being animated into/out of the modal.
 
     # Note: screen.fill() is handled by the main loop before calling this.
     # pygame.display.flip() is also handled by the main loop after all drawing.
+    # `target` draws onto another surface than the screen (the modal background).
+    target      = target or screen
 
-    container_w = int(WIDTH * 0.90)              # Cards occupy 90% of screen width
+    index       = get_list_index(tasks, animating_card_id_to_exclude)
+    container_w = card_container_width()
     x_margin    = (WIDTH - container_w) // 2     # Centered horizontally
-    y           = 15                             # Initial Y position for the first card
-    spacing     = 12                             # Vertical space between cards
-    inner_w     = container_w - 40               # Text area width inside a card (20px padding L/R)
+    offset      = int(scroll_y)
+
+    card_rects = []  # Stores (pygame.Rect, card) of the cards drawn
+    first, stop = visible_range(index)
+    for i in range(first, stop):
+        _, card, layout = index['items'][i]
+        rect = pygame.Rect(x_margin, index['tops'][i] - offset, container_w, layout['rect_h'])
+        target.blit(card_surface(layout), rect)
+        card_rects.append((rect, card))
+
+    # Thin scroll indicator when the list is taller than the screen
+    if index['total_h'] > HEIGHT:
+        bar_h = max(20, HEIGHT * HEIGHT // index['total_h'])
+        bar_y = int((HEIGHT - bar_h) * scroll_y / max_scroll(index))
+        pygame.draw.rect(target, (90, 90, 90), (WIDTH - 6, bar_y, 4, bar_h), border_radius=2)
 
-    card_rects = []  # Stores (pygame.Rect, card_id, card_text) for click detection
-
-    for card_id, text in tasks:
-        if animating_card_id_to_exclude and card_id == animating_card_id_to_exclude:
-            # If this card is being animated (e.g., into the modal), skip drawing it here.
-            # It will be drawn separately as part of the animation.
-            continue
-
-        lines = wrap_text(text, fonts['default'], inner_w)
-        line_h = fonts['default'].get_height()
-
-        # Calculate the height of the text block within the card
-        if not lines: # Handle cases with empty card text
-            text_block_height = 0
-        elif len(lines) == 1:
-            text_block_height = line_h
-        else:
-            # Height of all text lines + height of (n-1) inter-line spaces
-            text_block_height = (line_h * len(lines)) + \
-                                (line_h * (LINE_SPACING_MULTIPLIER - 1) * (len(lines) - 1))
-        
-        # Total height of the card rectangle, including vertical padding
-        rect_h = int(text_block_height + (CARD_VERTICAL_PADDING_EACH_SIDE * 2))
-
-        # Create the rectangle for the current card
-        rect = pygame.Rect(x_margin, y, container_w, rect_h)
-        pygame.draw.rect(screen, (22, 26, 30), rect, border_radius=10) # Dark card background
-
-        # Store the card's rectangle, ID, and text for later click detection
-        card_rects.append((rect, card_id, text))
-
-        # Draw the text lines onto the card
-        text_y_start = y + CARD_VERTICAL_PADDING_EACH_SIDE # Y position for the first line of text
-        current_text_y = text_y_start
-        for ln_text in lines:
-            text_surface = fonts['default'].render(ln_text, True, (255, 255, 255)) # White text
-            screen.blit(text_surface, (x_margin + 20, current_text_y)) # 20px left padding for text
-            current_text_y += line_h * LINE_SPACING_MULTIPLIER # Move to next line position
+    return card_rects
 
-        y += rect_h + spacing # Advance Y position for the next card
+# ---------- stale-data badge ----------------------------------------------
+# Shown in the bottom-right corner while the cards on screen come from the
+# cache or from before Trello became unreachable.
+stale_badge = {'since': None, 'surface': None, 'rect': None}
+
+def set_stale_since(since):
+    """Update the badge for cards last known current at `since` (None = live).
+    Return the screen rects that need repainting."""
+    if since == stale_badge['since']:
+        return []
+    old_rect = stale_badge['rect']
+    stale_badge.update(since=since, surface=None, rect=None)
+    if since is not None:
+        text = fonts['status'].render(f"Last synced {format_sync_time(since)}",
+                                      True, (200, 200, 200))
+        rect = text.get_rect().inflate(16, 8)
+        rect.bottomright = (WIDTH - 10, HEIGHT - 8)
+        surface = pygame.Surface(rect.size).convert()
+        surface.fill((0, 0, 0))
+        pygame.draw.rect(surface, (90, 40, 20), surface.get_rect(), border_radius=8)
+        surface.blit(text, (8, 4))
+        stale_badge.update(surface=surface, rect=rect)
+    return [r for r in (old_rect, stale_badge['rect']) if r]
+
+def draw_stale_badge(target=None):
+    if stale_badge['surface']:
+        (target or screen).blit(stale_badge['surface'], stale_badge['rect'])
+
+# ---------- metrics overlay -----------------------------------------------
+# A small panel in the top-left corner with smoothed frame time per phase
+# and the latest Trello request figures. Toggled with 'h' (or METRICS_HUD=1);
+# its text is re-rendered at most once a second.
+HUD_REFRESH_SECS = 1.0
+hud = {'visible': METRICS_HUD, 'surface': None, 'built_at': 0.0}
+frame_avg = {}  # phase -> smoothed milliseconds
+
+def hud_rect():
+    line_h = fonts['status'].get_linesize()
+    return pygame.Rect(4, 4, min(WIDTH - 8, 300), line_h * (3 + len(REQUEST_OPS)) + 8)
+
+def hud_lines():
+    ms = lambda phase: f"{phase} {frame_avg.get(phase, 0.0):.1f}"
+    lines = [f"frame {frame_avg.get('total', 0.0):.1f} ms",
+             "  ".join(ms(p) for p in ("events", "fetch", "list")),
+             "  ".join(ms(p) for p in ("modal", "hud", "flip"))]
+    with metrics_lock:
+        for op, h in request_metrics.items():
+            if h['count']:
+                lines.append(f"{op} {h['last'] * 1000:.0f} ms, avg {h['sum'] / h['count'] * 1000:.0f},"
+                             f" {h['errors']}/{h['count']} failed")
+            else:
+                lines.append(f"{op} -")
+    return lines
 
-    return card_rects
+def draw_hud():
+    if not hud['visible']:
+        return
+    now = time.time()
+    if hud['surface'] is None or now - hud['built_at'] >= HUD_REFRESH_SECS:
+        rect = hud_rect()
+        surface = pygame.Surface(rect.size).convert()
+        surface.fill((20, 20, 60))
+        y = 4
+        for line in hud_lines():
+            surface.blit(fonts['status'].render(line, True, (255, 255, 160)), (6, y))
+            y += fonts['status'].get_linesize()
+        hud.update(surface=surface, built_at=now)
+    screen.blit(hud['surface'], (4, 4))
+
+def toggle_hud():
+    hud.update(visible=not hud['visible'], surface=None)
+
+# ---------- kinetic scrolling ---------------------------------------------
+TAP_SLOP         = 10     # Pixels a touch may move and still count as a tap
+FLING_MIN_SPEED  = 30     # px/s below which a fling stops
+FLING_TIME_CONST = 0.325  # Seconds for fling speed to decay by 1/e
+
+touch  = None  # {'down_pos', 'last_y', 'last_t', 'velocity', 'dragging'} while a finger is down
+fling_velocity = 0.0
+
+def scroll_by(dy, index):
+    """Scroll the list by dy pixels, clamped to its extent. Return True if it moved."""
+    global scroll_y
+    new_y = min(max(scroll_y + dy, 0.0), float(max_scroll(index)))
+    moved, scroll_y = new_y != scroll_y, new_y
+    return moved
+
+def step_fling(dt, index):
+    """Advance a fling by dt seconds. Return True while it is still moving."""
+    global fling_velocity
+    if not fling_velocity:
+        return False
+    moved = scroll_by(fling_velocity * dt, index)
+    fling_velocity *= math.exp(-dt / FLING_TIME_CONST)
+    if not moved or abs(fling_velocity) < FLING_MIN_SPEED:
+        fling_velocity = 0.0
+    return moved
 
 # def show_undo_modal(card_id, card_text): # This function is now obsolete
 #     """Show a centered modal with an undo option after archiving a task."""
@@ -242,92 +2225,164 @@ def draw_list_view(tasks, animating_card_id_to_exclude=None):
 #     return undo_button_rect, card_id, card_text
 
 # ---------- New Enhanced Undo Modal Drawing Function -------------------------
-def draw_enhanced_undo_modal(screen, fonts, modal_y_pos, animating_card_surface, card_current_pos_on_screen, dismiss_progress): # Corrected parameter name
-    """Draws the enhanced undo modal with animations and new buttons."""
+# The modal's static parts (skrim, background, header, button faces and
+# labels) are composited once into cached surfaces; a frame only blits them
+# and draws the timer bar. The cache is rebuilt when the screen size or a
+# modal font changes.
+MODAL_COLORKEY = (255, 0, 255)  # Transparent corners of the cached modal pieces
+modal_cache = {}
+
+def _keyed_surface(size):
+    surface = pygame.Surface(size).convert()
+    surface.fill(MODAL_COLORKEY)
+    surface.set_colorkey(MODAL_COLORKEY, pygame.RLEACCEL)
+    return surface
+
+def build_modal_cache(fonts):
+    """Pre-render the modal pieces that do not change from frame to frame."""
     # Skrim
-    skrim_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-    skrim_surface.fill((0, 0, 0, 180))  # Semi-transparent black
-    screen.blit(skrim_surface, (0, 0))
+    skrim = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+    skrim.fill((0, 0, 0, 180))  # Semi-transparent black
 
     # Modal properties
     modal_width = WIDTH # Modal spans 100% of screen width
     modal_height = int(HEIGHT * 0.40) # Adjusted for taller buttons
     if modal_height < 280: modal_height = 280 # Min height increased for stacked buttons
-    
-    modal_x = 0 # Modal starts at the left edge of the screen
-    # modal_y_pos is passed in for animation
 
     modal_bg_color = (30, 30, 30) # Dark grey, similar to task cards
-    modal_rect = pygame.Rect(modal_x, modal_y_pos, modal_width, modal_height)
-    pygame.draw.rect(screen, modal_bg_color, modal_rect, border_radius=15)
+    chrome = _keyed_surface((modal_width, modal_height))
+    pygame.draw.rect(chrome, modal_bg_color, chrome.get_rect(), border_radius=15)
 
     # Header: "ITEM ARCHIVED"
     header_text_surf = fonts['modal_header'].render("ITEM ARCHIVED", True, (220, 220, 220))
-    header_text_rect = header_text_surf.get_rect(centerx=modal_rect.centerx, top=modal_y_pos + 20)
-    screen.blit(header_text_surf, header_text_rect)
-
-    # Animated Task Card (blit the pre-rendered surface at its current animated position)
-    if animating_card_surface and card_current_pos_on_screen:
-        screen.blit(animating_card_surface, card_current_pos_on_screen)
+    chrome.blit(header_text_surf, header_text_surf.get_rect(centerx=modal_width // 2, top=20))
 
-    # Buttons properties
+    # Buttons properties (positions are relative to the modal's top-left)
     button_height = 50
     button_spacing = 10 # Vertical space between stacked buttons
     stacked_button_width = modal_width - 40 # Buttons span modal width with 20px padding each side
-    
+
     # Dismiss Button (Grey, with timer) - Top button
     dismiss_button_color = (70, 70, 70) # Darker Grey
-    dismiss_button_y = modal_y_pos + modal_height - (2 * button_height) - button_spacing - 20 # Positioned above Undo
-    dismiss_button_rect = pygame.Rect(
-        modal_x + 20, # Centered with padding
-        dismiss_button_y,
-        stacked_button_width,
-        button_height
-    )
-    pygame.draw.rect(screen, dismiss_button_color, dismiss_button_rect, border_radius=10)
+    dismiss_offset = pygame.Rect(20, modal_height - (2 * button_height) - button_spacing - 20,
+                                 stacked_button_width, button_height)
+    dismiss_face = _keyed_surface(dismiss_offset.size)
+    pygame.draw.rect(dismiss_face, dismiss_button_color, dismiss_face.get_rect(), border_radius=10)
+    # Dismiss Text - drawn per frame after the timer overlay
+    dismiss_text_surf = fonts['modal_button'].render("Dismiss", True, (200, 200, 200))
+
+    # Undo Button (Blue) - Bottom button
+    undo_button_color = (0, 122, 255) # Blue
+    undo_offset = dismiss_offset.move(0, button_height + button_spacing) # Positioned below Dismiss
+    undo_face = _keyed_surface(undo_offset.size)
+    pygame.draw.rect(undo_face, undo_button_color, undo_face.get_rect(), border_radius=10)
+    undo_text_surf = fonts['modal_button'].render("Undo", True, (255, 255, 255))
+    undo_face.blit(undo_text_surf, undo_text_surf.get_rect(center=undo_face.get_rect().center))
+
+    modal_cache.clear()
+    modal_cache.update({
+        'key': (WIDTH, HEIGHT, fonts['modal_header'], fonts['modal_button']),
+        'skrim': skrim, 'chrome': chrome,
+        'dismiss_face': dismiss_face, 'dismiss_offset': dismiss_offset,
+        'dismiss_text': dismiss_text_surf,
+        'dismiss_text_offset': dismiss_text_surf.get_rect(center=dismiss_offset.center).topleft,
+        'undo_face': undo_face, 'undo_offset': undo_offset,
+        # Reused every frame: moved in place rather than reallocated
+        'buttons': {'undo_button': undo_offset.copy(), 'dismiss_button': dismiss_offset.copy()},
+        'timer_rect': dismiss_offset.copy(),
+    })
+
+def ensure_modal_cache(fonts):
+    if modal_cache.get('key') != (WIDTH, HEIGHT, fonts['modal_header'], fonts['modal_button']):
+        build_modal_cache(fonts)
+    return modal_cache
+
+def draw_enhanced_undo_modal(screen, fonts, modal_y_pos, animating_card_surface, card_current_pos_on_screen, dismiss_progress, draw_skrim=True): # Corrected parameter name
+    """Draws the enhanced undo modal with animations and new buttons.
+    draw_skrim=False leaves out the skrim, when it is part of a modal background."""
+    c = ensure_modal_cache(fonts)
+    modal_y = int(modal_y_pos)
+
+    if draw_skrim:
+        screen.blit(c['skrim'], (0, 0))
+    screen.blit(c['chrome'], (0, modal_y))
+
+    # Animated Task Card (blit the pre-rendered surface at its current animated position)
+    if animating_card_surface and card_current_pos_on_screen:
+        screen.blit(animating_card_surface, card_current_pos_on_screen)
+
+    dismiss_button_rect = c['buttons']['dismiss_button']
+    dismiss_button_rect.top = modal_y + c['dismiss_offset'].top
+    screen.blit(c['dismiss_face'], dismiss_button_rect)
 
     # Dismiss Timer Visual (Light grey overlay on Dismiss button) - DRAWN BEFORE TEXT
     timer_overlay_color = (120, 120, 120) # Light grey
-    timer_width = int(stacked_button_width * (1.0 - dismiss_progress)) # Use stacked_button_width
+    timer_width = int(dismiss_button_rect.width * (1.0 - dismiss_progress))
     if timer_width > 0: # Only draw if there's progress left
-        timer_overlay_rect = pygame.Rect(
-            dismiss_button_rect.left + (stacked_button_width - timer_width), # Anchored to the right
-            dismiss_button_rect.top,
-            timer_width,
-            dismiss_button_rect.height
-        )
-        # Draw the timer overlay carefully to respect the main button's border radius
+        timer_overlay_rect = c['timer_rect']
+        timer_overlay_rect.width = timer_width
+        timer_overlay_rect.right = dismiss_button_rect.right # Anchored to the right
+        timer_overlay_rect.top = dismiss_button_rect.top
         pygame.draw.rect(screen, timer_overlay_color, timer_overlay_rect, border_radius=10)
 
     # Dismiss Text - DRAWN AFTER TIMER OVERLAY
-    dismiss_text_surf = fonts['modal_button'].render("Dismiss", True, (200, 200, 200))
-    dismiss_text_rect = dismiss_text_surf.get_rect(center=dismiss_button_rect.center)
-    screen.blit(dismiss_text_surf, dismiss_text_rect)
+    text_x, text_y = c['dismiss_text_offset']
+    screen.blit(c['dismiss_text'], (text_x, modal_y + text_y))
 
+    undo_button_rect = c['buttons']['undo_button']
+    undo_button_rect.top = modal_y + c['undo_offset'].top
+    screen.blit(c['undo_face'], undo_button_rect)
 
-    # Undo Button (Blue) - Bottom button
-    undo_button_color = (0, 122, 255) # Blue
-    undo_button_y = dismiss_button_rect.bottom + button_spacing # Positioned below Dismiss
-    undo_button_rect = pygame.Rect(
-        modal_x + 20, # Centered with padding
-        undo_button_y,
-        stacked_button_width,
-        button_height
-    )
-    pygame.draw.rect(screen, undo_button_color, undo_button_rect, border_radius=10)
-    undo_text_surf = fonts['modal_button'].render("Undo", True, (255, 255, 255))
-    undo_text_rect = undo_text_surf.get_rect(center=undo_button_rect.center)
-    screen.blit(undo_text_surf, undo_text_rect)
-    
     # pygame.display.flip() # Flip is handled once at the end of the main loop
-    return {'undo_button': undo_button_rect, 'dismiss_button': dismiss_button_rect}
-
-
-# ---------- main loop -----------------------------------------------------
-tasks      = fetch_cards()
-last_fetch = time.time()
-card_rects = []  # Initialize card_rects
-
+    return c['buttons']
+
+
+# ---------- modal animation -----------------------------------------------
+# The list cannot change while the modal is up, so it is drawn once, with
+# the skrim over it, into a background surface that each modal frame just
+# blits (clipped to its dirty rects). A transition's eased positions are
+# tabulated when it starts; frames look them up by elapsed time rather than
+# stepping per frame, so a slow frame is skipped over and the slide keeps
+# to ANIMATION_DURATION instead of stretching.
+ANIMATION_KEYFRAMES = 60  # Table entries per transition; frames interpolate between them
+
+def ease_out_cubic(p):
+    return 1 - (1 - p) ** 3
+
+def ease_in_cubic(p):
+    return p ** 3
+
+transition = {'start': 0.0, 'duration': 1.0, 'frames': [(0.0,), (0.0,)]}
+
+def start_transition(starts, ends, ease, duration):
+    """Tabulate an eased move of each value in `starts` to its counterpart in `ends`."""
+    frames = []
+    for k in range(ANIMATION_KEYFRAMES + 1):
+        e = ease(k / ANIMATION_KEYFRAMES)
+        frames.append(tuple(a + (b - a) * e for a, b in zip(starts, ends)))
+    transition.update(start=time.perf_counter(), duration=duration, frames=frames)
+
+def sample_transition():
+    """Return (progress, values) of the current transition at this moment;
+    progress is 1.0 once it is over."""
+    progress = min((time.perf_counter() - transition['start']) / transition['duration'], 1.0)
+    x = progress * ANIMATION_KEYFRAMES
+    i = min(int(x), ANIMATION_KEYFRAMES - 1)
+    f = x - i
+    a, b = transition['frames'][i], transition['frames'][i + 1]
+    return progress, tuple(u + (v - u) * f for u, v in zip(a, b))
+
+def build_modal_background(tasks):
+    """Render the list as it stands (the modal's card already removed), with the
+    skrim over it, into the surface init_display() set aside for it."""
+    background = modal_background_surface
+    background.fill((0, 0, 0))
+    draw_list_view(tasks, None, target=background)
+    draw_stale_badge(background)
+    background.blit(ensure_modal_cache(fonts)['skrim'], (0, 0))
+    return background
+
+# ---------- app state -----------------------------------------------------
 # Old undo variables - to be removed or integrated
 # undo_active = False
 # undo_modal_button_rect = None
@@ -346,206 +2401,420 @@ app_state = APP_STATE_LIST_VIEW
 
 animating_card_details = {
     'id': None,
-    'text': None,
+    'card': None,
     'original_rect': None,
-    'rendered_surface': None, # This will store the pygame.Surface of the card
+    'layout': None, # The card's layout entry, pinned in the atlas while the modal shows it
+    'rendered_surface': None, # The card's pixels: a view into the atlas, not a copy
     'original_list_index': -1,
     'current_pos': None, # For animation: (x,y)
     'target_pos_in_modal': None # For animation: (x,y) relative to screen
 }
 
-modal_anim_start_time = 0.0
-modal_current_y = HEIGHT # Start off-screen
-modal_target_y = HEIGHT - int(HEIGHT * 0.35) - 20 # Target Y position for modal (20px from bottom)
-if modal_target_y + int(HEIGHT * 0.35) > HEIGHT -20: # ensure it's on screen
-    modal_target_y = HEIGHT - int(HEIGHT * 0.35) - 20
-
+modal_background = None  # List + skrim under the modal, see build_modal_background()
+modal_background_surface = None  # The screen-sized surface it is drawn into, made by init_display()
+modal_current_y = 0  # Modal top while it slides; set off-screen when it opens
+modal_target_y  = 0  # Modal top once open, set by main() from the screen height
 
 modal_dismiss_timer_start_time = 0.0
 UNDO_TIMEOUT = 5  # Seconds for the new modal timeout
 ANIMATION_DURATION = 0.3  # Seconds for modal slide and card animation
 
-# Ensure modal_target_y calculation for modal_height is consistent
-_modal_height_for_target_y = int(HEIGHT * 0.40) # Adjusted for taller buttons
-if _modal_height_for_target_y < 280: _modal_height_for_target_y = 280 # Min height increased
-modal_target_y = HEIGHT - _modal_height_for_target_y - 20 # Final position from bottom
+def start_modal_out():
+    """Slide the modal, with the card in it, off the bottom of the screen."""
+    card_x, card_y = animating_card_details['target_pos_in_modal']
+    drop = HEIGHT - modal_target_y
+    start_transition((modal_target_y, card_x, card_y), (HEIGHT, card_x, card_y + drop),
+                     ease_in_cubic, ANIMATION_DURATION)
 
 
 clock = pygame.time.Clock()
 active_modal_buttons = {} # To store clickable rects for modal buttons
+needs_redraw = True # List view only repaints when something changed
+list_dirty_rects = [] # ...or only these areas, after a partial list update
+tasks = []            # Cards on screen, in list order
+last_fetch = 0.0      # When the last snapshot was taken in
+
+# ---------- dirty-rectangle tracking --------------------------------------
+# Each frame repaints and pushes only the screen areas that changed, so SPI
+# displays transfer a few strips instead of the whole framebuffer. Drawing is
+# clipped to the dirty area; what lies inside it is redrawn in full (list,
+# skrim, modal), so partial repaints match a full-frame redraw.
+dirty_rects        = []  # Areas repainted this frame, passed to display.update
+last_moving_rects  = []  # Modal/card areas covered by the previous frame
+
+def begin_frame(rects, full):
+    """Clip drawing to `rects` (or the whole screen if `full`) and clear it."""
+    global dirty_rects
+    if hud['visible']:
+        rects = list(rects) + [hud_rect()] # The overlay is redrawn on top every frame
+    dirty_rects = [screen.get_rect()] if full else [r.clip(screen.get_rect()) for r in rects]
+    screen.set_clip(dirty_rects[0].unionall(dirty_rects[1:]))
+    screen.fill((0, 0, 0))
+
+def end_frame():
+    draw_hud()
+    frame_mark("hud")
+    screen.set_clip(None)
+    pygame.display.update(dirty_rects)
+    frame_mark("flip")
+    finish_frame()
+    mark_boot("first flip")
+
+# ---------- frame timing --------------------------------------------------
+# The main loop marks the end of each phase of a frame; finish_frame() adds
+# the phase times to the frame histograms and the HUD's running averages.
+frame_clock = {'start': 0.0, 'mark': 0.0, 'phases': {}}
+
+def start_frame():
+    frame_clock['start'] = frame_clock['mark'] = time.perf_counter()
+    frame_clock['phases'].clear()
+
+def frame_mark(phase):
+    """Charge the time since the previous mark to `phase`."""
+    now = time.perf_counter()
+    phases = frame_clock['phases']
+    phases[phase] = phases.get(phase, 0.0) + now - frame_clock['mark']
+    frame_clock['mark'] = now
+
+def finish_frame():
+    phases = frame_clock['phases']
+    phases['total'] = frame_clock['mark'] - frame_clock['start']
+    with metrics_lock:
+        for phase, seconds in phases.items():
+            observe(frame_metrics[phase], seconds)
+    for phase, seconds in phases.items():
+        frame_avg[phase] = 0.9 * frame_avg.get(phase, seconds * 1000) + 0.1 * seconds * 1000
+
+def modal_moving_rects(modal_y):
+    """Screen areas covered by the modal at modal_y and by the animating card."""
+    rects = [pygame.Rect(0, int(modal_y), WIDTH, HEIGHT - int(modal_y))]
+    surface, pos = animating_card_details['rendered_surface'], animating_card_details['current_pos']
+    if surface and pos:
+        rects.append(pygame.Rect((int(pos[0]), int(pos[1])), surface.get_size()).inflate(2, 2))
+    return rects
+
+def next_events(idle):
+    """Return this frame's events: paced at 60 FPS while animating, otherwise
+    sleeping until input, a snapshot, or the next refresh deadline."""
+    if not idle:
+        clock.tick(60)
+        return pygame.event.get()
+    timeout = last_fetch + REFRESH_SECS - time.time()
+    if timeout <= 0: # Poll is already due; SNAPSHOT_READY will wake us when it lands
+        timeout = REFRESH_SECS
+    if hud['visible']:
+        timeout = min(timeout, HUD_REFRESH_SECS)
+    first = pygame.event.wait(int(timeout * 1000))
+    clock.tick() # Keep the clock's frame timing meaningful after a long sleep
+    if first.type == pygame.NOEVENT:
+        return pygame.event.get()
+    return [first] + pygame.event.get()
 
-while True:
-    dt = clock.tick(60) / 1000.0 # Delta time in seconds
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit(); sys.exit()
-        if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-            pygame.quit(); sys.exit()
-        
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            pos = pygame.mouse.get_pos()
-            if app_state == APP_STATE_LIST_VIEW:
-                for i, (rect, card_id_clicked, card_text_clicked) in enumerate(card_rects):
-                    if rect.collidepoint(pos) and card_id_clicked:
+# ---------- main loop -----------------------------------------------------
+def main(size=None):
+    """Run the display; size=(width, height) opens a window instead of going full screen."""
+    global tasks, latest_snapshot, last_fetch, app_state, animating_card_details
+    global modal_background, modal_current_y, modal_target_y, modal_dismiss_timer_start_time
+    global active_modal_buttons, needs_redraw, list_dirty_rects, last_moving_rects
+    global touch, fling_velocity
+
+    init_display(size)
+    # Modal's resting position: 40% of the screen (at least 280px), 20px from the bottom
+    modal_height = max(int(HEIGHT * 0.40), 280)
+    modal_target_y = HEIGHT - modal_height - 20
+    modal_current_y = HEIGHT # Start off-screen
+
+    if SYNC_SOCKET:
+        # A render client: the sync daemon fetches and writes for us
+        tasks = [Card("", "Connecting to the sync daemon...")]
+        start_sync_client()
+    else:
+        start_outbox_worker()
+        # Show the last run's cards on the first frame, marked stale, while the live fetch runs
+        cached = load_cards_cache()
+        if cached is not None:
+            pending = pending_card_states()
+            tasks = [c for c in cached['cards'] if not pending.get(c.id)]
+            latest_snapshot = cached
+            set_stale_since(cached['stale_since'])
+        else:
+            tasks = [Card("", "Loading cards...")]  # Placeholder until the first snapshot arrives
+        start_fetch_worker()
+        if WEBHOOK_PORT:
+            start_webhook_listener()
+    start_thumbnail_worker()
+    if METRICS_PATH:
+        start_metrics_worker()
+
+    while True:
+        # Full rate only while the modal slides in/out, its dismiss timer runs, or the list is flung
+        events = next_events(app_state == APP_STATE_LIST_VIEW and not needs_redraw
+                             and not list_dirty_rects and not fling_velocity)
+        start_frame()
+        for event in events:
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                save_outbox() # Journal a tap made just before quitting
+                pygame.quit(); sys.exit()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+                toggle_hud()
+                needs_redraw = True
+
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                pos = event.pos
+                if app_state == APP_STATE_LIST_VIEW:
+                    # Whether this touch is a tap or a scroll is decided by where it goes next
+                    fling_velocity = 0.0
+                    touch = {'down_pos': pos, 'last_y': pos[1], 'last_t': time.time(),
+                             'velocity': 0.0, 'dragging': False}
+                elif app_state == APP_STATE_MODAL_ACTIVE:
+                    if active_modal_buttons.get('undo_button') and active_modal_buttons['undo_button'].collidepoint(pos):
+                        queue_card_write(animating_card_details['id'], False)
+                        # Restore card to its original position right away; the write is sent in the background
+                        if 0 <= animating_card_details['original_list_index'] <= len(tasks):
+                            tasks.insert(animating_card_details['original_list_index'], animating_card_details['card'])
+                        else: # Fallback
+                            tasks.append(animating_card_details['card'])
+                        invalidate_list_index(animating_card_details['original_list_index'])
+                        app_state = APP_STATE_MODAL_ANIMATING_OUT
+                        start_modal_out()
+                    elif active_modal_buttons.get('dismiss_button') and active_modal_buttons['dismiss_button'].collidepoint(pos):
+                        queue_card_write(animating_card_details['id'], True) # Sent in the background
+                        # Card is already visually removed from list, tasks list reflects this if pop was used
+                        # Or if we filter, it's fine.
+                        app_state = APP_STATE_MODAL_ANIMATING_OUT
+                        start_modal_out()
+
+            elif event.type == pygame.MOUSEMOTION and touch:
+                dy = event.pos[1] - touch['last_y']
+                if abs(event.pos[1] - touch['down_pos'][1]) > TAP_SLOP:
+                    touch['dragging'] = True
+                if touch['dragging'] and dy:
+                    now = time.time()
+                    # Smoothed finger speed in list pixels per second, for the fling on release
+                    touch['velocity'] = 0.8 * (-dy / max(now - touch['last_t'], 0.001)) + 0.2 * touch['velocity']
+                    touch['last_y'], touch['last_t'] = event.pos[1], now
+                    if scroll_by(-dy, get_list_index(tasks)):
+                        needs_redraw = True
+
+            elif event.type == pygame.MOUSEBUTTONUP and touch:
+                if touch['dragging']:
+                    if time.time() - touch['last_t'] < 0.1: # Finger still moving when lifted
+                        fling_velocity = touch['velocity']
+                elif app_state == APP_STATE_LIST_VIEW:
+                    hit = hit_test_list(tasks, touch['down_pos'])
+                    if hit and is_real_card(hit[1].id):
+                        rect, card_clicked, i = hit
                         # --- Initiate Modal ---
                         app_state = APP_STATE_MODAL_ANIMATING_IN
-                        
-                        animating_card_details['id'] = card_id_clicked
-                        animating_card_details['text'] = card_text_clicked
+
+                        animating_card_details['id'] = card_clicked.id
+                        animating_card_details['card'] = card_clicked
                         animating_card_details['original_rect'] = rect.copy()
                         animating_card_details['original_list_index'] = i
-                        
-                        # Create a surface for the card to animate
-                        # This assumes card content is drawn simply without complex overlaps
-                        animating_card_details['rendered_surface'] = screen.subsurface(rect).copy()
-                        
+
+                        # The card's pixels in the atlas are whole even if it is partly scrolled off
+                        # screen; pinned, they stay put through the modal and an undo
+                        layout = layout_card(card_clicked, rect.width)
+                        card_atlas.pin(layout)
+                        animating_card_details['layout'] = layout
+                        animating_card_details['rendered_surface'] = card_surface(layout)
+
                         animating_card_details['current_pos'] = rect.topleft
-                        
+
                         # Calculate target position for the card within the modal
                         # The card should be centered horizontally within the modal, and placed below the header.
                         # _modal_w is now effectively WIDTH, and _modal_x_abs is 0
-                        
+
                         header_height_approx = fonts['modal_header'].get_height() + 20 # header text + padding above
                         card_y_offset_in_modal = 20 + header_height_approx + 10 # top_padding + header_h + padding_below_header
-                        
+
                         # Card is centered on the screen, as modal is full width
                         _card_target_x_on_screen = (WIDTH - rect.width) // 2
                         _card_target_y_on_screen = modal_target_y + card_y_offset_in_modal
-                        
+
                         animating_card_details['target_pos_in_modal'] = (_card_target_x_on_screen, _card_target_y_on_screen)
 
-                        modal_anim_start_time = time.time()
                         modal_current_y = HEIGHT # Start modal off-screen
+                        needs_redraw = True # First modal frame darkens the whole screen
 
                         # Remove the card from the main tasks list as it's now being handled by the modal.
                         # Storing its original index allows for correct re-insertion if "Undo" is chosen.
                         tasks.pop(animating_card_details['original_list_index'])
-                        break
-            elif app_state == APP_STATE_MODAL_ACTIVE:
-                if active_modal_buttons.get('undo_button') and active_modal_buttons['undo_button'].collidepoint(pos):
-                    if unarchive_card(animating_card_details['id']):
-                        # Restore card to its original position
-                        if 0 <= animating_card_details['original_list_index'] <= len(tasks):
-                            tasks.insert(animating_card_details['original_list_index'], (animating_card_details['id'], animating_card_details['text']))
-                        else: # Fallback
-                            tasks.append((animating_card_details['id'], animating_card_details['text']))
-                    # Regardless of API success for now, proceed to animate out
-                    app_state = APP_STATE_MODAL_ANIMATING_OUT
-                    modal_anim_start_time = time.time() # Reset timer for out-animation
-                elif active_modal_buttons.get('dismiss_button') and active_modal_buttons['dismiss_button'].collidepoint(pos):
-                    archive_card(animating_card_details['id']) # API call
-                    # Card is already visually removed from list, tasks list reflects this if pop was used
-                    # Or if we filter, it's fine.
-                    app_state = APP_STATE_MODAL_ANIMATING_OUT
-                    modal_anim_start_time = time.time()
-
-    # --- State Logic & Drawing ---
-    screen.fill((0, 0, 0)) # Clear screen at the beginning of each frame
-
-    if app_state == APP_STATE_LIST_VIEW:
-        if time.time() - last_fetch > REFRESH_SECS:
-            tasks = fetch_cards() # ToDo: consider if animating_card_id should be preserved if fetch happens during animation
-            last_fetch = time.time()
-        card_rects = draw_list_view(tasks, None) # Pass None as no card is currently animating
-
-    elif app_state == APP_STATE_MODAL_ANIMATING_IN:
-        elapsed_anim_time = time.time() - modal_anim_start_time
-        anim_progress = min(elapsed_anim_time / ANIMATION_DURATION, 1.0)
-
-        # Modal slide animation (ease-out can be added later)
-        modal_current_y = HEIGHT - ((HEIGHT - modal_target_y) * anim_progress)
-
-        # Card position animation
-        start_x, start_y = animating_card_details['original_rect'].topleft
-        target_x, target_y = animating_card_details['target_pos_in_modal']
-        
-        current_card_x = start_x + (target_x - start_x) * anim_progress
-        current_card_y = start_y + (target_y - start_y) * anim_progress
-        animating_card_details['current_pos'] = (current_card_x, current_card_y)
-
-        # Draw background tasks (excluding the one being animated)
-        draw_list_view(tasks, animating_card_details['id'])
-        
-        # Draw the modal and the animating card
-        active_modal_buttons = draw_enhanced_undo_modal(
-            screen, fonts,
-            modal_current_y,
-            animating_card_details['rendered_surface'],
-            animating_card_details['current_pos'],
-            0.0 # No dismiss progress during intro animation
-        )
-
-        if anim_progress == 1.0:
-            app_state = APP_STATE_MODAL_ACTIVE
-            modal_dismiss_timer_start_time = time.time()
-            # The card is now at its 'target_pos_in_modal'
-            animating_card_details['current_pos'] = animating_card_details['target_pos_in_modal']
-
-
-    elif app_state == APP_STATE_MODAL_ACTIVE:
-        # Logic for active modal (timer, button clicks) will be here
-        # For now, just draw it statically after animation
-        draw_list_view(tasks, animating_card_details['id']) # Draw background
-        
-        elapsed_dismiss_time = time.time() - modal_dismiss_timer_start_time
-        current_dismiss_progress = min(elapsed_dismiss_time / UNDO_TIMEOUT, 1.0)
-
-        active_modal_buttons = draw_enhanced_undo_modal(
-            screen, fonts,
-            modal_target_y, # Modal is at its final Y position
-            animating_card_details['rendered_surface'],
-            animating_card_details['current_pos'], # Card is at its final position in modal
-            current_dismiss_progress
-        )
-        
-        if current_dismiss_progress == 1.0: # Timeout
-            archive_card(animating_card_details['id'])
-            app_state = APP_STATE_MODAL_ANIMATING_OUT
-            modal_anim_start_time = time.time()
-
-    elif app_state == APP_STATE_MODAL_ANIMATING_OUT:
-        elapsed_anim_time = time.time() - modal_anim_start_time
-        anim_progress = min(elapsed_anim_time / ANIMATION_DURATION, 1.0)
-
-        # Modal slide out animation (reversing the in-animation)
-        modal_current_y = modal_target_y + ((HEIGHT - modal_target_y) * anim_progress)
-        
-        # Card also moves with the modal (its position relative to modal top remains same)
-        # We need to calculate its on-screen position based on modal_current_y
-        _card_target_x_on_screen, _card_target_y_in_modal_final = animating_card_details['target_pos_in_modal']
-        _offset_y_card_from_modal_top = _card_target_y_in_modal_final - modal_target_y
-        current_card_y_on_screen = modal_current_y + _offset_y_card_from_modal_top
-        
-        animating_card_details['current_pos'] = (_card_target_x_on_screen, current_card_y_on_screen)
-
-        # Draw background tasks
-        # If card was unarchived, it's back in 'tasks'. If archived, it's not.
-        # draw_list_view will handle not drawing it if its ID matches animating_card_details['id']
-        # but for animating out, we usually don't want to see it in the background list yet.
-        # The list should only update visually *after* the modal is gone.
-        # So, draw the list as it was when the modal became active.
-        # For simplicity now, just draw current tasks, filtering out the animated card.
-        draw_list_view(tasks, animating_card_details['id'])
-
-        active_modal_buttons = draw_enhanced_undo_modal(
-            screen, fonts,
-            modal_current_y,
-            animating_card_details['rendered_surface'],
-            animating_card_details['current_pos'],
-            1.0 # Dismiss progress is full as it's disappearing
-        )
-
-        if anim_progress == 1.0:
-            app_state = APP_STATE_LIST_VIEW
-            # Reset animating_card_details
-            animating_card_details = {
-                'id': None, 'text': None, 'original_rect': None,
-                'rendered_surface': None, 'original_list_index': -1,
-                'current_pos': None, 'target_pos_in_modal': None
-            }
-            card_rects = draw_list_view(tasks, None) # Force redraw of list in its new state
-            active_modal_buttons = {}
-
-
-    pygame.display.flip() # Single flip at the end of the main loop
+                        invalidate_list_index(animating_card_details['original_list_index'])
+
+                        modal_background = build_modal_background(tasks)
+                        start_transition((HEIGHT,) + rect.topleft,
+                                         (modal_target_y,) + animating_card_details['target_pos_in_modal'],
+                                         ease_out_cubic, ANIMATION_DURATION)
+                touch = None
+
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                needs_redraw = True
+        frame_mark("events")
+
+        # --- Thumbnail and snapshot intake ---
+        ready = take_thumbnails()
+        if ready: # Repaint the cards that were waiting for them (list view only)
+            list_dirty_rects.extend(refresh_thumbnails(ready))
+        if app_state == APP_STATE_LIST_VIEW:
+            # Snapshots are only swapped in here, in list view, so a card that is
+            # in the modal flow (popped from tasks) never reappears mid-animation.
+            snapshot = take_latest_snapshot()
+            if snapshot:
+                mark_boot("first fetch")
+                if snapshot['started_at'] < last_write_landed:
+                    # Fetched before our last write landed and may not reflect it. Pull
+                    # again, unless Trello is unreachable (the worker retries on its own
+                    # schedule): then keep the cards on screen and only show the badge.
+                    if snapshot['stale_since'] is None:
+                        request_fetch(full=True)
+                    else:
+                        list_dirty_rects.extend(set_stale_since(snapshot['stale_since']))
+                else:
+                    # Hide cards whose archive is still waiting in the outbox.
+                    pending = pending_card_states()
+                    new_tasks = [c for c in snapshot['cards'] if not pending.get(c.id)]
+                    diff = diff_cards(tasks, new_tasks)
+                    if diff['first_changed'] is not None:
+                        gone = set(diff['deletes']) | set(diff['edits'])
+                        evict_layouts([c for c in tasks if c.id in gone])
+                        tasks = new_tasks
+                        # Cards above the first change keep their layout, position and pixels
+                        invalidate_list_index(diff['first_changed'])
+                        index = get_list_index(tasks)
+                        if scroll_by(0, index): # Clamped because the list got shorter: everything moved
+                            needs_redraw = True
+                        else:
+                            top = max(item_screen_top(index, diff['first_changed']), 0)
+                            if top < HEIGHT:
+                                list_dirty_rects.append(pygame.Rect(0, top, WIDTH, HEIGHT - top))
+                            list_dirty_rects.append(pygame.Rect(WIDTH - 6, 0, 6, HEIGHT)) # Scroll indicator
+                    list_dirty_rects.extend(set_stale_since(snapshot['stale_since']))
+                    last_fetch = time.time()
+
+            if fling_velocity and step_fling(clock.get_time() / 1000.0, get_list_index(tasks)):
+                needs_redraw = True
+            if hud['visible'] and time.time() - hud['built_at'] >= HUD_REFRESH_SECS:
+                list_dirty_rects.append(hud_rect())
+        frame_mark("fetch")
+
+        if app_state == APP_STATE_LIST_VIEW and not needs_redraw and not list_dirty_rects:
+            continue # Nothing changed; the screen already shows the list
+
+        # --- State Logic & Drawing ---
+        # Each branch starts its frame with the areas it will change; a pending
+        # needs_redraw turns that into a full-screen repaint.
+        if app_state == APP_STATE_LIST_VIEW:
+            begin_frame(list_dirty_rects, full=needs_redraw)
+            list_dirty_rects = []
+            draw_list_view(tasks, None) # Pass None as no card is currently animating
+            draw_stale_badge()
+            frame_mark("list")
+
+        elif app_state == APP_STATE_MODAL_ANIMATING_IN:
+            # Modal slides up (eased) while the card flies into it
+            anim_progress, (modal_current_y, card_x, card_y) = sample_transition()
+            animating_card_details['current_pos'] = (card_x, card_y)
+
+            moving_rects = modal_moving_rects(modal_current_y)
+            begin_frame(moving_rects + last_moving_rects, full=needs_redraw)
+            last_moving_rects = moving_rects
+
+            # Background tasks (without the one being animated) under the skrim
+            screen.blit(modal_background, (0, 0))
+            frame_mark("list")
+
+            # Draw the modal and the animating card
+            active_modal_buttons = draw_enhanced_undo_modal(
+                screen, fonts,
+                modal_current_y,
+                animating_card_details['rendered_surface'],
+                animating_card_details['current_pos'],
+                0.0, # No dismiss progress during intro animation
+                draw_skrim=False
+            )
+            frame_mark("modal")
+
+            if anim_progress == 1.0:
+                app_state = APP_STATE_MODAL_ACTIVE
+                modal_dismiss_timer_start_time = time.time()
+                # The card is now at its 'target_pos_in_modal'
+                animating_card_details['current_pos'] = animating_card_details['target_pos_in_modal']
+
+
+        elif app_state == APP_STATE_MODAL_ACTIVE:
+            # Logic for active modal (timer, button clicks) will be here
+            # Only the dismiss timer changes while the modal sits still
+            begin_frame([active_modal_buttons['dismiss_button']], full=needs_redraw)
+            screen.blit(modal_background, (0, 0)) # Draw background
+            frame_mark("list")
+
+            elapsed_dismiss_time = time.time() - modal_dismiss_timer_start_time
+            current_dismiss_progress = min(elapsed_dismiss_time / UNDO_TIMEOUT, 1.0)
+
+            active_modal_buttons = draw_enhanced_undo_modal(
+                screen, fonts,
+                modal_target_y, # Modal is at its final Y position
+                animating_card_details['rendered_surface'],
+                animating_card_details['current_pos'], # Card is at its final position in modal
+                current_dismiss_progress,
+                draw_skrim=False
+            )
+            frame_mark("modal")
+
+            if current_dismiss_progress == 1.0: # Timeout
+                queue_card_write(animating_card_details['id'], True)
+                app_state = APP_STATE_MODAL_ANIMATING_OUT
+                start_modal_out()
+
+        elif app_state == APP_STATE_MODAL_ANIMATING_OUT:
+            # Modal slides out (eased), the card moving with it
+            anim_progress, (modal_current_y, card_x, card_y) = sample_transition()
+            animating_card_details['current_pos'] = (card_x, card_y)
+
+            moving_rects = modal_moving_rects(modal_current_y)
+            begin_frame(moving_rects + last_moving_rects, full=needs_redraw)
+            last_moving_rects = moving_rects
+
+            # Draw the list as it was when the modal opened; if the card was
+            # unarchived it is back in 'tasks', but only shows once the modal is gone.
+            screen.blit(modal_background, (0, 0))
+            frame_mark("list")
+
+            active_modal_buttons = draw_enhanced_undo_modal(
+                screen, fonts,
+                modal_current_y,
+                animating_card_details['rendered_surface'],
+                animating_card_details['current_pos'],
+                1.0, # Dismiss progress is full as it's disappearing
+                draw_skrim=False
+            )
+            frame_mark("modal")
+
+            if anim_progress == 1.0:
+                app_state = APP_STATE_LIST_VIEW
+                card_atlas.unpin(animating_card_details['layout'])
+                if not any(c.id == animating_card_details['id'] for c in tasks): # Archived, not undone
+                    evict_layouts([animating_card_details['card']])
+                # Reset animating_card_details
+                animating_card_details = {
+                    'id': None, 'card': None, 'original_rect': None, 'layout': None,
+                    'rendered_surface': None, 'original_list_index': -1,
+                    'current_pos': None, 'target_pos_in_modal': None
+                }
+                active_modal_buttons = {}
+                last_moving_rects = []
+                modal_background = None
+                needs_redraw = True # Repaint the list cleanly on the next (idle) frame
+                end_frame()
+                continue
+
+        needs_redraw = False
+        end_frame() # Push only this frame's dirty rects to the display
+
+
+if __name__ == "__main__":
+    if "--sync-daemon" in sys.argv[1:]:
+        run_sync_daemon()
+    else:
+        main()